@@ -0,0 +1,141 @@
+"""
+Compare the different ways of reading snapshot files from the git history
+
+    python -m scripts.benchmark_giterator [--path <repo>] [--count <commits>] [--file <path>]
+
+or measure commit log parsing on a synthetic repository
+
+    python -m scripts.benchmark_giterator --synthetic <commits>
+"""
+import time
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Iterable
+
+from src.giterator import Giterator
+
+
+PROJECT_DIR: Path = Path(__file__).resolve().parent.parent
+
+
+def parse_args() -> dict:
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--path", type=str, default=str(PROJECT_DIR),
+        help="root of the repository",
+    )
+    parser.add_argument(
+        "--count", type=int, default=200,
+        help="number of most recent commits to read",
+    )
+    parser.add_argument(
+        "--file", type=str, default="docs/snapshots/ard.ndjson",
+        help="file to read at each commit",
+    )
+    parser.add_argument(
+        "--synthetic", type=int, default=0,
+        help="create a temporary repository with this number of commits and benchmark iter_commits",
+    )
+
+    return vars(parser.parse_args())
+
+
+def benchmark(name: str, hashes: list, read: Callable[[str], bytes]):
+    benchmark_stream(name, (read(hash) for hash in hashes))
+
+
+def benchmark_stream(name: str, stream: Iterable[bytes]):
+    num_reads = 0
+    num_bytes = 0
+    start = time.time()
+    for data in stream:
+        num_reads += 1
+        num_bytes += len(data) if data else 0
+    seconds = time.time() - start
+    print(
+        f"{name:14} {num_reads:6} reads {seconds:8.3f} sec"
+        f" {num_reads / max(seconds, 1e-9):9.1f} reads/sec"
+        f" {num_bytes / 1024 / 1024 / max(seconds, 1e-9):9.1f} MB/sec"
+    )
+
+
+def create_synthetic_repo(path: str, num_commits: int):
+    subprocess.check_call(["git", "init", "-q", path])
+    process = subprocess.Popen(["git", "fast-import", "--quiet"], stdin=subprocess.PIPE, cwd=path)
+    for i in range(num_commits):
+        data = f"snapshot {i}\n".encode()
+        message = f"commit #{i}\n\nsome longer description"
+        process.stdin.write(
+            f"commit refs/heads/master\n"
+            f"author a <a@b.c> {1600000000 + i * 3600} +0100\n"
+            f"committer a <a@b.c> {1600000000 + i * 3600} +0100\n"
+            f"data {len(message)}\n{message}\n"
+            f"M 100644 inline docs/snapshots/file{i % 10}.ndjson\n"
+            f"data {len(data)}\n".encode() + data + b"\n"
+        )
+    process.stdin.close()
+    process.wait()
+
+
+def benchmark_commits(name: str, git: Giterator, access: Callable):
+    start = time.time()
+    num = 0
+    for commit in git.iter_commits():
+        access(commit)
+        num += 1
+    seconds = time.time() - start
+
+    # second pass for memory, tracemalloc slows down everything
+    tracemalloc.start()
+    commits = []
+    for commit in git.iter_commits():
+        access(commit)
+        commits.append(commit)
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print(
+        f"{name:14} {num:6} commits {seconds:8.3f} sec"
+        f" {seconds / max(num, 1) * 1_000_000:8.1f} usec/commit"
+        f" {held / max(num, 1):8.0f} bytes/commit held"
+    )
+
+
+def main_synthetic(num_commits: int):
+    with tempfile.TemporaryDirectory() as path:
+        create_synthetic_repo(path, num_commits)
+        git = Giterator(path)
+        benchmark_commits("hash only", git, lambda c: c.hash)
+        benchmark_commits("all fields", git, lambda c: c.to_dict())
+
+
+def main(path: str, count: int, file: str, synthetic: int):
+    if synthetic:
+        main_synthetic(synthetic)
+        return
+
+    git = Giterator(path)
+    hashes = [c["hash"] for c in git.iter_commit_hashes(file)][-count:]
+
+    def read_archive(hash: str) -> bytes:
+        for f in git.iter_files(hash, [file]):
+            return f.data
+
+    with Giterator(path, object_store=True) as git_objects:
+        benchmark("git archive", hashes, read_archive)
+        benchmark("git cat-file", hashes, lambda h: git.read_blob(h, file))
+        benchmark("object store", hashes, lambda h: git_objects.read_blob(h, file))
+
+    # all versions of the file in one `git fast-export` pass,
+    #   commits that did not change the file have no entry in the stream
+    benchmark_stream("fast-export", (data for _, _, data in git.iter_blob_history(file)))
+
+    git.close()
+
+
+if __name__ == "__main__":
+    main(**parse_args())
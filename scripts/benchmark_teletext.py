@@ -0,0 +1,89 @@
+"""
+Measure the time and memory it takes to load the snapshots
+
+    python -m scripts.benchmark_teletext [--path docs/snapshots] [--repeat 3]
+"""
+import gc
+import time
+import argparse
+import tracemalloc
+from pathlib import Path
+from typing import List
+
+from src.teletext import Teletext
+
+
+PROJECT_DIR: Path = Path(__file__).resolve().parent.parent
+
+
+def parse_args() -> dict:
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--path", type=str, default=str(PROJECT_DIR / "docs" / "snapshots"),
+        help="directory of the ndjson snapshots",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="number of timing runs, the best one is reported",
+    )
+
+    return vars(parser.parse_args())
+
+
+def load(files: List[Path]) -> List[Teletext]:
+    return [Teletext.from_ndjson(f.read_bytes()) for f in files]
+
+
+def main(path: str, repeat: int):
+    files = sorted(f for f in Path(path).glob("*.ndjson") if not f.name.startswith("_"))
+    num_bytes = sum(f.stat().st_size for f in files)
+
+    seconds = None
+    for i in range(repeat):
+        start = time.time()
+        load(files)
+        cur_seconds = time.time() - start
+        seconds = cur_seconds if seconds is None else min(seconds, cur_seconds)
+
+    gc.collect()
+    tracemalloc.start()
+    teletexts = load(files)
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # peak memory while loading a single file, includes the file content
+    peaks = []
+    for f in files:
+        data = f.read_bytes()
+        gc.collect()
+        tracemalloc.start()
+        Teletext.from_ndjson(data)
+        peaks.append((f.name, len(data), tracemalloc.get_traced_memory()[1]))
+        tracemalloc.stop()
+        del data
+
+    num_pages = sum(len(tt.pages) for tt in teletexts)
+    num_blocks = sum(
+        len(line)
+        for tt in teletexts
+        for page in tt.pages.values()
+        for line in page.lines
+    )
+    print(f"snapshots    {len(teletexts):10}")
+    print(f"file bytes   {num_bytes:10}")
+    print(f"pages        {num_pages:10}")
+    print(f"blocks       {num_blocks:10}")
+    print(f"load time    {seconds:10.3f} sec  {num_bytes / 1024 / 1024 / seconds:.1f} MB/sec")
+    print(f"memory       {held:10} bytes")
+    print(f"per snapshot {held // max(1, len(teletexts)):10} bytes")
+    print(f"per block    {held / max(1, num_blocks):10.1f} bytes")
+    print()
+    print(f"{'peak memory while loading':30} {'file bytes':>10} {'peak bytes':>10}")
+    for name, size, peak in peaks:
+        print(f"{name:30} {size:10} {peak:10} {peak / max(1, size):5.1f}x")
+
+
+if __name__ == "__main__":
+    main(**parse_args())
@@ -70,7 +70,8 @@ def export_elasticsearch(tt_iterator: TeletextIterator):
     if result.documents:
         after_hash = result.documents[0]["commit_hash"]
 
-    for tt in tt_iterator.iter_teletexts(after_hash=after_hash):
+    # unchanged snapshots would only be exported twice
+    for tt in tt_iterator.iter_teletexts(after_hash=after_hash, changed_only=True):
         export_items = []
         for index, page in tt.pages.items():
             export_items.append({
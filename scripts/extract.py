@@ -31,7 +31,7 @@ def export_page_changes(tt_iterator: TeletextIterator) -> pd.DataFrame:
                 page = tt.pages.get(index)
 
                 if prev_page is not None and page is not None:
-                    equal = page.lines[1:] == prev_page.lines[1:]
+                    equal = page.line_hashes[1:] == prev_page.line_hashes[1:]
                 else:
                     equal = page == prev_page
 
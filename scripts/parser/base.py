@@ -37,16 +37,15 @@ class TeletextParserBase:
 
                 for page_number in page_numbers:
 
-                    sub_page = 0
-                    while True:
+                    sub_pages = set(tt.get_sub_pages(page_number))
+                    if 1 not in sub_pages:
+                        print(f"{self.__class__.__name__}: page {page_number} missing")
+
+                    # sub-pages after the first gap are ignored
+                    sub_page = 1
+                    while sub_page in sub_pages:
+                        func(tt.get_page(page_number, sub_page))
                         sub_page += 1
-                        page = tt.get_page(page_number, sub_page)
-                        if not page:
-                            if sub_page == 1:
-                                print(f"{self.__class__.__name__}: page {page_number} missing")
-                            break
-
-                        func(page)
 
     def page_to_lines(self, page: TeletextPage) -> List[str]:
         return page.to_ansi(colors=False).replace("\xa0", " ").splitlines()
@@ -58,7 +58,8 @@ class Viewer:
         self.index_stack = []
         self.mode = "ansi"
         self.colors = True
-        self.tt_iterator = TeletextIterator()
+        # keep recently viewed snapshots in memory for going back and forth
+        self.tt_iterator = TeletextIterator(blob_cache=256 * 1024 * 1024, intern_lines=100_000)
         self.commit_hashes = [
             json.loads(line) for line in
             (TeletextIterator.PROJECT_ROOT / "docs" / "snapshots" / "_timestamps.ndjson")
@@ -226,10 +227,12 @@ class Viewer:
     def set_scraper(self, scraper: str):
         self.scraper: Scraper = scraper_classes[scraper]()
         if self.commit_index is None:
-            self.tt = Teletext.from_ndjson(self.scraper.filename())
+            self.tt = Teletext.from_ndjson(
+                self.scraper.filename(), lazy=True, intern_table=self.tt_iterator.intern_table,
+            )
         else:
             self.tt = self.tt_iterator.get_historic_teletext(
-                scraper, self.commit_hashes[self.commit_index]["hash"]
+                scraper, self.commit_hashes[self.commit_index]["hash"], lazy=True,
             )
             if not self.tt:
                 self.tt = Teletext()
@@ -238,8 +241,7 @@ class Viewer:
                 page = TeletextPage()
                 page.new_line()
                 page.add_block(TeletextPage.Block(f"{scraper} @ {self.tt.timestamp} not found"))
-                self.tt.pages[(100, 1)] = page
-                self.tt.page_index = [(100, 1)]
+                self.tt.add_page(page)
 
         self.set_page(self.page, self.sub_page)
 
@@ -12,3 +12,5 @@ version:
 from .commit import Commit
 from .file import File
 from .giterator import Giterator
+from .asyncgiterator import AsyncGiterator
+from .blobcache import BlobCache
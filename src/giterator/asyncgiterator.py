@@ -0,0 +1,352 @@
+import os
+import signal
+import asyncio
+import tarfile
+from pathlib import Path
+from typing import AsyncGenerator, List, Tuple, Optional, Sequence, Union
+
+from .commit import Commit
+from .file import File
+from .catfile import parse_tree
+from .giterator import Giterator
+
+
+class AsyncGiterator:
+    """
+    asyncio version of the ``Giterator`` reading methods.
+
+    All git processes are started with ``asyncio.create_subprocess_exec``
+    so a single event loop can overlap git I/O of several iterations.
+
+    Blob reads go through a pool of up to ``max_concurrent_reads``
+    persistent `git cat-file --batch` processes.
+
+    The yielded ``Commit`` and ``File`` objects belong to a synchronous
+    ``Giterator`` (``self.git``), which also decodes the lazy commit fields.
+    """
+
+    def __init__(
+            self,
+            path: Union[str, Path],
+            git_args: List[str] = None,
+            verbose: bool = False,
+            max_concurrent_reads: int = 4,
+    ):
+        self.git = Giterator(path, git_args=git_args, verbose=verbose)
+        self.path = self.git.path
+        self.max_concurrent_reads = max(1, max_concurrent_reads)
+        self._readers: List["_AsyncCatFileBatch"] = []
+        self._idle_readers: Optional[asyncio.Queue] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        """
+        Stop all background `git cat-file` processes.
+        """
+        for reader in self._readers:
+            await reader.close()
+        self._readers.clear()
+        self._idle_readers = None
+        self.git.close()
+
+    async def iter_commits(
+            self,
+            *filenames: Union[str, Path],
+            reverse: bool = False,
+            offset: int = 0,
+            count: int = 0,
+            parse_changes: bool = True,
+            raw: bool = False,
+            revision: Optional[str] = None,
+    ) -> AsyncGenerator[Commit, None]:
+        """
+        Same as ``Giterator.iter_commits`` (without the commit cache)
+        """
+        git_cmd = self.git._log_command(
+            *filenames, reverse=reverse, parse_changes=parse_changes, raw=raw, revision=revision,
+        )
+        process = await self._start(git_cmd)
+
+        try:
+            delimiter = self.git.DELIMITER1.encode()
+            record = None
+            cur_count = 0
+            while count <= 0 or (cur_count - offset) < count:
+                line = await process.stdout.readline()
+                if not line:
+                    break
+
+                # a new commit starts
+                if line.startswith(delimiter):
+                    if record:
+                        if cur_count >= offset:
+                            yield Commit.from_log_record(self.git, b"".join(record))
+                        cur_count += 1
+                    record = []
+
+                elif record is not None:
+                    record.append(line)
+
+            if record:
+                if cur_count >= offset and (count <= 0 or (cur_count - offset) < count):
+                    yield Commit.from_log_record(self.git, b"".join(record))
+
+        finally:
+            await self._stop(process)
+
+    async def iter_commit_hashes(
+            self,
+            *filenames: str,
+            offset: int = 0,
+            count: int = 0,
+            topo_order: bool = False,
+            all: bool = False,
+    ) -> AsyncGenerator[dict, None]:
+        """
+        Same as ``Giterator.iter_commit_hashes``
+        """
+        git_cmd = self.git._rev_list_command(*filenames, topo_order=topo_order, all=all)
+        process = await self._start(git_cmd)
+
+        try:
+            commit = dict()
+            cur_count = 0
+            while count <= 0 or (cur_count - offset) < count:
+                line = await process.stdout.readline()
+                if not line:
+                    break
+
+                if self.git._parse_rev_list_line(commit, line):
+                    yield commit
+                    cur_count += 1
+                    commit = dict()
+
+        finally:
+            await self._stop(process)
+
+    async def iter_files(
+            self,
+            treeish: str,
+            filenames: Optional[Sequence[str]] = None
+    ) -> AsyncGenerator[File, None]:
+        """
+        Same as ``Giterator.iter_files``, the tar stream of `git archive`
+        is parsed while it arrives.
+        """
+        git_cmd = ["git", "archive", "--format=tar", treeish]
+        if filenames:
+            git_cmd += list(filenames)
+
+        process = await self._start(git_cmd, stderr=asyncio.subprocess.PIPE)
+
+        try:
+            num_headers = 0
+            async for tarinfo, data in _iter_tar_stream(process.stdout):
+                num_headers += 1
+                if tarinfo.isfile():
+                    yield File(self.git, tarinfo, data)
+
+            if not num_headers and filenames:
+                raise tarfile.ReadError((await process.stderr.read()).decode("utf-8"))
+
+        finally:
+            await self._stop(process)
+
+    async def read_object(self, spec: str) -> Optional[Tuple[str, bytes]]:
+        """
+        Same as ``Giterator.read_object``.
+
+        Up to ``max_concurrent_reads`` calls are served in parallel.
+        """
+        if self._idle_readers is None:
+            self._idle_readers = asyncio.Queue()
+
+        if self._idle_readers.empty() and len(self._readers) < self.max_concurrent_reads:
+            reader = _AsyncCatFileBatch(self.git)
+            self._readers.append(reader)
+        else:
+            reader = await self._idle_readers.get()
+
+        try:
+            obj = await reader.read(spec)
+        except BaseException:
+            # the reader may be in the middle of an object (e.g. when cancelled),
+            #   so it is replaced by a fresh one
+            reader.kill()
+            self._readers.remove(reader)
+            reader = _AsyncCatFileBatch(self.git)
+            self._readers.append(reader)
+            self._idle_readers.put_nowait(reader)
+            raise
+
+        self._idle_readers.put_nowait(reader)
+        return obj
+
+    async def read_blob(self, treeish: str, path: Optional[str] = None) -> Optional[bytes]:
+        """
+        Same as ``Giterator.read_blob``
+        """
+        obj = await self.read_object(f"{treeish}:{path}" if path else treeish)
+        if obj is not None and obj[0] == "blob":
+            return obj[1]
+
+    async def list_tree(self, treeish: str, path: Optional[str] = None) -> List[Tuple[str, str, str]]:
+        """
+        Same as ``Giterator.list_tree``
+        """
+        obj = await self.read_object(f"{treeish}:{path}" if path else f"{treeish}^{{tree}}")
+        if obj is None or obj[0] != "tree":
+            return []
+        return parse_tree(obj[1])
+
+    async def _start(self, git_cmd: List[str], **kwargs) -> asyncio.subprocess.Process:
+        self.git._log(" ".join(git_cmd))
+        return await asyncio.create_subprocess_exec(
+            *git_cmd,
+            stdout=asyncio.subprocess.PIPE,
+            cwd=self.path,
+            **kwargs,
+        )
+
+    async def _stop(self, process: asyncio.subprocess.Process):
+        _kill(process)
+        await process.wait()
+
+
+class _AsyncCatFileBatch:
+    """
+    asyncio version of ``CatFileBatch``, used by one caller at a time
+    """
+
+    def __init__(self, git: Giterator):
+        self.git = git
+        self._process: Optional[asyncio.subprocess.Process] = None
+
+    async def close(self):
+        if self._process is not None:
+            # cat-file exits at the end of its input
+            self._process.stdin.close()
+            await self._process.wait()
+            self._process = None
+
+    def kill(self):
+        """
+        Stop the process right away, without waiting for it
+        """
+        if self._process is not None:
+            _kill(self._process)
+            self._process = None
+
+    async def read(self, spec: str) -> Optional[Tuple[str, bytes]]:
+        if "\n" in spec:
+            raise ValueError(f"Invalid object spec {repr(spec)}")
+        try:
+            return await self._read(spec)
+        except (BrokenPipeError, ConnectionResetError, asyncio.IncompleteReadError):
+            # the process died in between, try once again with a fresh one
+            await self.close()
+            return await self._read(spec)
+
+    async def _read(self, spec: str) -> Optional[Tuple[str, bytes]]:
+        if self._process is None or self._process.returncode is not None:
+            await self.close()
+            git_cmd = ["git", "cat-file", "--batch"]
+            self.git._log(" ".join(git_cmd))
+            self._process = await asyncio.create_subprocess_exec(
+                *git_cmd,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                cwd=self.git.path,
+            )
+
+        stdin, stdout = self._process.stdin, self._process.stdout
+        stdin.write(spec.encode("utf-8") + b"\n")
+        await stdin.drain()
+
+        header = await stdout.readline()
+        if not header:
+            raise asyncio.IncompleteReadError(b"", None)
+
+        header = header.decode("utf-8").split()
+        if len(header) != 3:
+            # "<spec> missing" or "<spec> ambiguous"
+            return None
+
+        _, type, size = header
+        data = await stdout.readexactly(int(size) + 1)
+        return type, data[:-1]
+
+
+def _kill(process: asyncio.subprocess.Process):
+    # Process.kill() polls the child first, which can reap it behind
+    #   the back of asyncio's child watcher, so signal it directly
+    if process.returncode is None:
+        try:
+            os.kill(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+async def _iter_tar_stream(
+        stream: asyncio.StreamReader,
+) -> AsyncGenerator[Tuple[tarfile.TarInfo, bytes], None]:
+    """
+    Minimal reader for the tar streams of `git archive`.
+
+    Yields each header and the member's data (empty for non-files).
+    Supports pax extended headers and GNU long names.
+    """
+    pax_headers = {}
+    long_name = None
+    while True:
+        try:
+            buf = await stream.readexactly(tarfile.BLOCKSIZE)
+        except asyncio.IncompleteReadError:
+            return
+
+        try:
+            tarinfo = tarfile.TarInfo.frombuf(buf, "utf-8", "surrogateescape")
+        except tarfile.EOFHeaderError:
+            # end-of-archive marker
+            return
+
+        data = b""
+        if tarinfo.size:
+            padded_size = -(-tarinfo.size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+            data = (await stream.readexactly(padded_size))[:tarinfo.size]
+
+        if tarinfo.type == tarfile.XHDTYPE:
+            pax_headers = _parse_pax_headers(data)
+            continue
+        elif tarinfo.type == tarfile.XGLTYPE:
+            # global header, git puts the commit hash in there
+            continue
+        elif tarinfo.type == tarfile.GNUTYPE_LONGNAME:
+            long_name = data.rstrip(b"\0").decode("utf-8", "surrogateescape")
+            continue
+
+        if "path" in pax_headers:
+            tarinfo.name = pax_headers["path"]
+        if long_name is not None:
+            tarinfo.name = long_name
+        pax_headers = {}
+        long_name = None
+
+        yield tarinfo, data
+
+
+def _parse_pax_headers(data: bytes) -> dict:
+    headers = {}
+    pos = 0
+    while pos < len(data):
+        space = data.index(b" ", pos)
+        length = int(data[pos:space])
+        key, value = data[space + 1:pos + length - 1].split(b"=", 1)
+        headers[key.decode("utf-8")] = value.decode("utf-8", "surrogateescape")
+        pos += length
+    return headers
@@ -0,0 +1,126 @@
+import re
+import hashlib
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Optional, Tuple, Union, Dict
+
+
+class BlobCache:
+    """
+    LRU cache of git objects with a total byte budget.
+
+    Only keys that always resolve to the same object should be stored,
+    see ``is_immutable``.
+
+    If a ``spill_path`` is given, evicted objects are written to that
+    directory and read back from there on the next request.
+    Files in the spill directory are never removed.
+
+    The cache can be shared between threads.
+    """
+
+    # a full object hash, optionally followed by a path inside that tree or commit
+    RE_IMMUTABLE_SPEC = re.compile(r"^[0-9a-f]{40}(:.*)?$")
+
+    def __init__(self, max_bytes: int, spill_path: Union[None, str, Path] = None):
+        """
+        :param max_bytes: int, maximum number of bytes of object contents to keep in memory
+        :param spill_path: optional str or Path, directory for evicted objects
+        """
+        self.max_bytes = max_bytes
+        self.spill_path = Path(spill_path) if spill_path is not None else None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.spill_hits = 0
+        self._objects: Dict[str, Tuple[str, bytes]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}({self.num_bytes}/{self.max_bytes} bytes"
+            f", hits={self.hits}, misses={self.misses}, evictions={self.evictions})"
+        )
+
+    def __len__(self):
+        return len(self._objects)
+
+    @property
+    def num_bytes(self) -> int:
+        return self._bytes
+
+    @classmethod
+    def is_immutable(cls, spec: str) -> bool:
+        return bool(cls.RE_IMMUTABLE_SPEC.match(spec))
+
+    def get(self, spec: str) -> Optional[Tuple[str, bytes]]:
+        """
+        Return the object type and content or None if not cached
+        """
+        with self._lock:
+            obj = self._objects.get(spec)
+            if obj is not None:
+                self._objects.move_to_end(spec)
+                self.hits += 1
+                return obj
+
+        obj = self._read_spilled(spec)
+        with self._lock:
+            if obj is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.spill_hits += 1
+        self.put(spec, *obj)
+        return obj
+
+    def put(self, spec: str, type: str, data: bytes):
+        evicted = []
+        with self._lock:
+            if spec in self._objects or len(data) > self.max_bytes:
+                return
+            self._objects[spec] = (type, data)
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                old_spec, old_obj = self._objects.popitem(last=False)
+                self._bytes -= len(old_obj[1])
+                self.evictions += 1
+                evicted.append((old_spec, old_obj))
+
+        for old_spec, old_obj in evicted:
+            self._spill(old_spec, *old_obj)
+
+    def clear(self):
+        with self._lock:
+            self._objects.clear()
+            self._bytes = 0
+
+    def _spill_filename(self, spec: str) -> Path:
+        key = hashlib.sha1(spec.encode("utf-8")).hexdigest()
+        return self.spill_path / key[:2] / key[2:]
+
+    def _spill(self, spec: str, type: str, data: bytes):
+        if self.spill_path is None:
+            return
+        filename = self._spill_filename(spec)
+        if filename.exists():
+            return
+        try:
+            filename.parent.mkdir(parents=True, exist_ok=True)
+            tmp_filename = filename.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp_filename.write_bytes(type.encode("ascii") + b"\n" + data)
+            tmp_filename.replace(filename)
+        except OSError:
+            pass
+
+    def _read_spilled(self, spec: str) -> Optional[Tuple[str, bytes]]:
+        if self.spill_path is None:
+            return
+        try:
+            content = self._spill_filename(spec).read_bytes()
+        except OSError:
+            return
+        type, data = content.split(b"\n", 1)
+        return type.decode("ascii"), data
@@ -0,0 +1,184 @@
+import json
+import hashlib
+import datetime
+import subprocess
+from pathlib import Path
+from typing import Generator, List, Optional, TYPE_CHECKING
+
+from .helper import get_git_dir
+
+if TYPE_CHECKING:
+    from .giterator import Giterator
+
+
+class CommitCache:
+    """
+    Persistent cache of ``git log`` and ``git rev-list --count`` results.
+
+    Everything is stored in ``.git/giterator-cache/``, keyed by the git arguments
+    and pathspec. A cached log remembers the commits of ``HEAD`` and of the refs
+    selected by the git arguments (e.g. ``--all``) it was created at (the tips).
+    If only ``HEAD`` moved forward without merges, only the new commits are
+    requested from git and appended. Otherwise the entry is rebuilt.
+
+    Commit counts are stored along with the branch tips they were counted at.
+
+    ``ref_names`` are always empty because they change whenever a branch moves.
+    """
+
+    VERSION = 2
+    # git arguments that select the refs to walk instead of HEAD
+    REF_OPTIONS = ("--all", "--branches", "--tags", "--remotes", "--glob")
+
+    def __init__(self, repo: "Giterator"):
+        self.repo = repo
+        self.path: Path = get_git_dir(repo.path) / "giterator-cache"
+
+    def iter_commit_dicts(
+            self,
+            filenames: List[str],
+            parse_changes: bool,
+            raw: bool,
+            first_parent: bool = False,
+    ) -> Generator[dict, None, None]:
+        """
+        Yields the commit dicts of ``Giterator._iter_commit_dicts``, oldest first
+        """
+        key_args = [self.repo._git_args, filenames, parse_changes, raw]
+        if first_parent:
+            key_args.append("first-parent")
+        key = self._key("log", *key_args)
+        data_file = self.path / f"{key}.ndjson"
+        info = self._read_json(self.path / f"{key}.json")
+
+        ref_options = [arg for arg in self.repo._git_args if arg.startswith(self.REF_OPTIONS)]
+        try:
+            tips = self.repo.rev_parse("HEAD", *ref_options)
+        except Exception:
+            # no commits yet
+            return
+        tip = tips[0]
+
+        if info and info["tips"] == tips:
+            yield from self._read_commits(data_file, info["size"])
+            return
+
+        since = None
+        if info and not ref_options and self._is_linear_extension(info["tips"][0], tip):
+            since = info["tips"][0]
+
+        if ref_options:
+            revision = None
+        else:
+            revision = f"{since}..{tip}" if since else tip
+        new_commits = list(self.repo._iter_commit_dicts(
+            *filenames,
+            parse_changes=parse_changes,
+            raw=raw,
+            revision=revision,
+            first_parent=first_parent,
+        ))
+        for commit in new_commits:
+            commit.pop("ref_names", None)
+
+        size = self._write_commits(data_file, new_commits, info["size"] if since else 0)
+        if size is not None:
+            self._write_json(self.path / f"{key}.json", {
+                "version": self.VERSION,
+                "tips": tips,
+                "size": size,
+            })
+
+        if since:
+            yield from self._read_commits(data_file, info["size"])
+        yield from new_commits
+
+    def _is_linear_extension(self, since: str, tip: str) -> bool:
+        """
+        True if ``tip`` is reached from ``since`` by single-parent commits.
+
+        ``git log`` then lists the new commits before the history of ``since``.
+        Merges may bring in older commits which are listed in between.
+        """
+        if not self.repo.is_ancestor(since, tip):
+            return False
+        git_cmd = ["git", "rev-list", "--merges", "-n", "1", f"{since}..{tip}"]
+        self.repo._log(" ".join(git_cmd))
+        return not subprocess.check_output(git_cmd, cwd=self.repo.path).strip()
+
+    def num_commits(self, args: List[str]) -> int:
+        """
+        Return the output of the ``git rev-list --count`` command ``args``
+        """
+        options = args[3:args.index("--")] if "--" in args else args[3:]
+        key = self._key("count", args)
+        tips = self._key(self.repo.rev_parse(*options))
+
+        counts_file = self.path / "counts.json"
+        # entries of the previous format are dropped
+        counts = {
+            k: v for k, v in (self._read_json(counts_file) or {}).items()
+            if isinstance(v, dict)
+        }
+        entry = counts.get(key)
+        if entry is None or entry.get("tips") != tips:
+            self.repo._log(" ".join(args))
+            # only the count of the latest branch tips is kept
+            entry = counts[key] = {
+                "tips": tips,
+                "count": int(subprocess.check_output(args, cwd=self.repo.path)),
+            }
+            self._write_json(counts_file, counts)
+
+        return entry["count"]
+
+    def _key(self, *args) -> str:
+        return hashlib.sha1(
+            json.dumps([self.VERSION, *args]).encode("utf-8")
+        ).hexdigest()[:16]
+
+    def _read_json(self, filename: Path) -> Optional[dict]:
+        try:
+            data = json.loads(filename.read_text())
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get("version", self.VERSION) == self.VERSION:
+            return data
+
+    def _write_json(self, filename: Path, data: dict):
+        try:
+            self.path.mkdir(exist_ok=True)
+            tmp_filename = filename.with_suffix(".tmp")
+            tmp_filename.write_text(json.dumps(data))
+            tmp_filename.replace(filename)
+        except OSError as e:
+            self.repo._log(f"can not write cache {filename}: {e}")
+
+    def _read_commits(self, filename: Path, size: int) -> Generator[dict, None, None]:
+        with open(filename, "rb") as fp:
+            data = fp.read(size)
+        # dates stay ISO strings, Commit parses them on first access
+        for line in data.split(b"\n")[:-1]:
+            yield json.loads(line)
+
+    def _write_commits(self, filename: Path, commits: List[dict], offset: int) -> Optional[int]:
+        """
+        Write commits after the first ``offset`` bytes of the file,
+        returns the new file size or None on error
+        """
+        try:
+            self.path.mkdir(exist_ok=True)
+            with open(filename, "r+b" if offset else "wb") as fp:
+                # drop anything that was written after the last complete update
+                fp.seek(offset)
+                fp.truncate()
+                for commit in commits:
+                    commit = {
+                        key: value.isoformat() if isinstance(value, datetime.datetime) else value
+                        for key, value in commit.items()
+                    }
+                    fp.write(json.dumps(commit, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+                    fp.write(b"\n")
+                return fp.tell()
+        except OSError as e:
+            self.repo._log(f"can not write cache {filename}: {e}")
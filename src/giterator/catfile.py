@@ -0,0 +1,125 @@
+import sys
+import threading
+import subprocess
+from typing import Optional, Tuple, List
+
+
+class CatFileBatch:
+    """
+    Wrapper around a long-running `git cat-file --batch` process.
+
+    Object specs like ``<commit>:<path>`` or plain object hashes are
+    written to stdin and the object contents are read back from
+    the same stdout pipe, so there is no process spawn per object.
+
+    Calls are serialized with a lock, so one instance can be shared
+    between threads. If the process died, it is restarted on next use.
+    """
+
+    def __init__(self, path: str, verbose: bool = False):
+        self.path = path
+        self.verbose = verbose
+        self._process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def _log(self, *args):
+        if self.verbose:
+            print(*args, file=sys.stderr)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._stop()
+
+    def read(self, spec: str) -> Optional[Tuple[str, bytes]]:
+        """
+        Read a single object.
+
+        :param spec: str, anything that `git rev-parse` understands,
+            e.g. ``HEAD:docs/snapshots/ard.ndjson`` or a blob hash
+        :return: tuple of object type and content,
+            or None if the object does not exist
+        """
+        if "\n" in spec:
+            raise ValueError(f"Invalid object spec {repr(spec)}")
+
+        with self._lock:
+            try:
+                return self._read(spec)
+            except (BrokenPipeError, EOFError):
+                # the process died in between, try once again with a fresh one
+                self._stop()
+                return self._read(spec)
+
+    def _start(self):
+        git_cmd = ["git", "cat-file", "--batch"]
+        self._log(" ".join(git_cmd))
+        self._process = subprocess.Popen(
+            git_cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=self.path,
+        )
+
+    def _stop(self):
+        if self._process is not None:
+            try:
+                self._process.stdin.close()
+            except BrokenPipeError:
+                pass
+            self._process.kill()
+            self._process.wait()
+            self._process = None
+
+    def _read(self, spec: str) -> Optional[Tuple[str, bytes]]:
+        if self._process is None or self._process.poll() is not None:
+            self._stop()
+            self._start()
+
+        stdin, stdout = self._process.stdin, self._process.stdout
+        stdin.write(spec.encode("utf-8") + b"\n")
+        stdin.flush()
+
+        header = stdout.readline()
+        if not header:
+            raise EOFError(f"git cat-file exited while reading '{spec}'")
+
+        header = header.decode("utf-8").split()
+        if len(header) != 3:
+            # "<spec> missing" or "<spec> ambiguous"
+            return None
+
+        _, type, size = header
+        size = int(size)
+        data = stdout.read(size)
+        # the content is followed by a single newline
+        if len(data) != size or not stdout.read(1):
+            raise EOFError(f"git cat-file exited while reading '{spec}'")
+
+        return type, data
+
+
+def parse_tree(data: bytes) -> List[Tuple[str, str, str]]:
+    """
+    Parse the binary content of a git tree object.
+
+    :param data: bytes, as returned by `git cat-file tree <hash>`
+    :return: list of tuples of (mode, name, hash)
+    """
+    entries = []
+    pos = 0
+    while pos < len(data):
+        space = data.index(b" ", pos)
+        null = data.index(b"\0", space)
+        entries.append((
+            data[pos:space].decode("ascii"),
+            data[space + 1:null].decode("utf-8"),
+            data[null + 1:null + 21].hex(),
+        ))
+        pos = null + 21
+    return entries
@@ -1,11 +1,86 @@
 import datetime
-from typing import List, Optional, Generator, TextIO
+from typing import List, Optional, Generator, TextIO, Union, Tuple, TYPE_CHECKING
 
 from .file import File
-from .helper import safe_console_string
+from .helper import safe_console_string, decode, parse_datetime
+
+if TYPE_CHECKING:
+    from .giterator import Giterator
+
+
+# marks a field that has not been decoded from the raw log record yet
+_UNDECODED = object()
+
+
+def _lazy_field(name: str, decode: str):
+    slot = f"_{name}"
+
+    def getter(self):
+        value = getattr(self, slot)
+        if value is _UNDECODED:
+            getattr(self, decode)()
+            value = getattr(self, slot)
+        return value
+
+    def setter(self, value):
+        setattr(self, slot, value)
+
+    return property(getter, setter)
+
+
+def _date_field(name: str):
+    slot = f"_{name}"
+
+    def getter(self):
+        value = getattr(self, slot)
+        if value is _UNDECODED:
+            self._decode_header()
+            value = getattr(self, slot)
+        if isinstance(value, str):
+            value = parse_datetime(value)
+            setattr(self, slot, value)
+        return value
+
+    def setter(self, value):
+        setattr(self, slot, value)
+
+    return property(getter, setter)
 
 
 class Commit:
+    """
+    A single commit of the ``git log``.
+
+    Commits created by ``Giterator.iter_commits`` only decode their hash
+    right away and keep the raw log record. All other fields are decoded
+    on first access, so walks that only need the hash stay cheap.
+    """
+
+    __slots__ = (
+        "repo", "hash", "_record",
+        "_tree_hash", "_parent_hash", "_author", "_author_email", "_author_date",
+        "_committer", "_committer_email", "_committer_date", "_encoding",
+        "_message", "_ref_names", "_changes",
+    )
+
+    # the fields of Giterator.LOG_INFOS that follow the hash, in order
+    HEADER_FIELDS = (
+        "tree_hash", "parent_hash", "author", "author_email", "author_date",
+        "committer", "committer_email", "committer_date", "ref_names", "encoding",
+    )
+
+    tree_hash = _lazy_field("tree_hash", "_decode_header")
+    parent_hash = _lazy_field("parent_hash", "_decode_header")
+    author = _lazy_field("author", "_decode_header")
+    author_email = _lazy_field("author_email", "_decode_header")
+    author_date = _date_field("author_date")
+    committer = _lazy_field("committer", "_decode_header")
+    committer_email = _lazy_field("committer_email", "_decode_header")
+    committer_date = _date_field("committer_date")
+    encoding = _lazy_field("encoding", "_decode_header")
+    ref_names = _lazy_field("ref_names", "_decode_header")
+    message = _lazy_field("message", "_decode_message")
+    changes = _lazy_field("changes", "_decode_changes")
 
     def __init__(
             self,
@@ -15,10 +90,10 @@ class Commit:
             parent_hash: List[str],
             author: str,
             author_email: str,
-            author_date: datetime.datetime,
+            author_date: Union[str, datetime.datetime],
             committer: str,
             committer_email: str,
-            committer_date: datetime.datetime,
+            committer_date: Union[str, datetime.datetime],
             encoding: str,
             message: str,
             ref_names: Optional[List[str]] = None,
@@ -27,10 +102,12 @@ class Commit:
         from .giterator import Giterator
         self.repo: Giterator = repo
         self.hash: str = hash
+        self._record = None
         self.tree_hash = tree_hash
         self.parent_hash = parent_hash or []
         self.author = author
         self.author_email = author_email
+        # ISO strings are parsed on first access
         self.author_date = author_date
         self.committer = committer
         self.committer_email = committer_email
@@ -40,6 +117,22 @@ class Commit:
         self.ref_names = ref_names or []
         self.changes = changes or []
 
+    @classmethod
+    def from_log_record(cls, repo: "Giterator", record: bytes) -> "Commit":
+        """
+        Create a commit from the raw output that ``git log`` printed
+        for it in the ``Giterator.iter_commits`` format.
+        """
+        commit = cls.__new__(cls)
+        commit.repo = repo
+        commit.hash = record[:record.index(b"\n")].decode("ascii")
+        commit._record = record
+        for name in cls.HEADER_FIELDS:
+            setattr(commit, f"_{name}", _UNDECODED)
+        commit._message = _UNDECODED
+        commit._changes = _UNDECODED
+        return commit
+
     def __repr__(self):
         #param = f"'{self.hash}'"
         param = ", ".join(
@@ -51,6 +144,44 @@ class Commit:
     def __hash__(self):
         return int(self.hash, base=16)
 
+    def _decode_header(self):
+        lines = self._record.split(b"\n", len(self.HEADER_FIELDS) + 1)
+        for line, log_info, name in zip(lines[1:], self.repo.LOG_INFOS[1:], self.HEADER_FIELDS):
+            value = decode(line, ignore_errors=True).rstrip()
+            if len(log_info) > 2:
+                value = log_info[2](value)
+            setattr(self, f"_{name}", value)
+
+    def _split_record(self) -> Tuple[List[bytes], List[bytes]]:
+        """
+        Returns the message lines and the changes lines
+        """
+        lines = self._record.split(b"\n")
+        delimiter = self.repo.DELIMITER2[1:].encode()
+        start = len(self.HEADER_FIELDS) + 1
+        for i in range(start, len(lines)):
+            if lines[i].startswith(delimiter):
+                return lines[start:i], lines[i + 1:]
+        return lines[start:], []
+
+    def _decode_message(self):
+        self._message = "\n".join(
+            decode(line, ignore_errors=True).rstrip()
+            for line in self._split_record()[0]
+        ).rstrip()
+
+    def _decode_changes(self):
+        commit = {"changes": []}
+        for line in self._split_record()[1]:
+            line = decode(line, ignore_errors=True).strip()
+            if not line:
+                continue
+            if line.startswith(":"):
+                self.repo._parse_raw(commit, line)
+            elif not self.repo._parse_changes(commit, line):
+                self.repo._parse_summary(commit, line)
+        self._changes = commit["changes"]
+
     def to_dict(self):
         return {
             "hash": self.hash,
@@ -111,10 +242,12 @@ class Commit:
         if commit.changes:
             print("changes:", file=file)
             for ch in commit.changes:
-                s = f"  {ch['type']} +{ch['additions']:5} -{ch['deletions']:5}"
+                s = f"  {ch['type']} +{ch.get('additions', '-'):5} -{ch.get('deletions', '-'):5}"
                 if ch["type"] == "rename":
                     s += f" {ch['old_name']} => {ch['name']}"
                 else:
                     s += f" {ch['name']}"
+                if "new_blob" in ch:
+                    s += f" ({ch['old_blob'] or '-'} => {ch['new_blob'] or '-'})"
 
                 print(s, file=file)
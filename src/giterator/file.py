@@ -1,6 +1,5 @@
 import tarfile
 from typing import Dict, Union, Optional
-from io import BytesIO
 import json
 import datetime
 
@@ -9,11 +8,10 @@ class File:
     Representation of a file, kept in memory, by reading a `git archive` stream.
     """
 
-    def __init__(self, repo, buffer: BytesIO, tarinfo: tarfile.TarInfo):
+    def __init__(self, repo, tarinfo: tarfile.TarInfo, data: bytes):
         self.repo = repo
-        self._buffer = buffer
         self._tarinfo = tarinfo
-        self._data = None
+        self._data = data
 
     def __repr__(self):
         return f"{self.__class__.__name__}('{self.name}', {self.size}, {self.mtime})"
@@ -36,16 +34,6 @@ class File:
 
     @property
     def data(self) -> bytes:
-        if self._data is None:
-            if self._tarinfo.sparse is not None:
-                self._data = b""
-                for offset, size in self._tarinfo.sparse:
-                    self._buffer.seek(offset)
-                    self._data += self._buffer.read(size)
-            else:
-                self._buffer.seek(self._tarinfo.offset_data)
-                self._data = self._buffer.read(self._tarinfo.size)
-
         return self._data
 
     def text(self, encoding: Optional[str] = None, errors: Optional[str] = None) -> str:
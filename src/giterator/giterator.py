@@ -3,28 +3,42 @@ import sys
 import tarfile
 import subprocess
 from pathlib import Path
-from io import BytesIO, StringIO
-from typing import Generator, List, Tuple, Optional, Sequence, Union
+from collections import OrderedDict
+from typing import Generator, List, Tuple, Optional, Sequence, Union, Dict
 
-from .helper import parse_datetime, decode, get_git_renaming
+from .helper import parse_datetime, decode, get_git_renaming, unquote_git_path
 from .commit import Commit
 from .file import File
+from .catfile import CatFileBatch, parse_tree
+from .objects import ObjectStore
+from .cache import CommitCache
+from .blobcache import BlobCache
 
 
 class Giterator:
     RE_CHANGE_NUMSTATS = re.compile(r"^(-|\d+)\s(-|\d+)\s(.*)$")
     RE_CHANGE_SUMMARY = re.compile(r"^([a-z]+) mode (\d\d\d\d\d\d) (.+)")
     MAX_TOKEN_LENGTH = 64
+    NULL_HASH = "0" * 40
+    # `git log --raw` status letters to the `--summary` type names
+    RAW_STATUS_TYPES = {
+        "A": "create",
+        "D": "delete",
+        "M": "change",
+        "T": "change",
+        "R": "rename",
+        "C": "copy",
+    }
     LOG_INFOS = [
         ("%H", "hash"),
         ("%T", "tree_hash"),
         ("%P", "parent_hash", lambda s: s.split() if s.strip() else []),
         ("%an", "author"),
         ("%ae", "author_email"),
-        ("%aI", "author_date", parse_datetime),
+        ("%aI", "author_date"),
         ("%an", "committer"),
         ("%ae", "committer_email"),
-        ("%aI", "committer_date", parse_datetime),
+        ("%aI", "committer_date"),
         ("%D", "ref_names", lambda s: s.split(", ") if s.strip() else []),
         ("%e", "encoding"),
     ]
@@ -37,35 +51,120 @@ class Giterator:
             path: Union[str, Path],
             git_args: List[str] = None,
             verbose: bool = False,
+            object_store: bool = False,
+            cache: bool = False,
+            blob_cache: int = 0,
+            blob_cache_path: Union[None, str, Path] = None,
     ):
+        """
+        :param path: str or Path, root directory of the repository
+        :param git_args: optional list of extra arguments to `git log` and `git rev-list`
+        :param verbose: bool, print git commands to stderr
+        :param object_store: bool, if True, ``read_object`` and the methods using it
+            read the ``.git/objects`` database directly instead of asking `git cat-file`.
+        :param cache: bool, if True, the commit log and commit counts are cached
+            in the ``.git`` directory and only new commits are parsed on later runs.
+            The ``ref_names`` of cached commits are empty, see ``CommitCache``.
+        :param blob_cache: int, if > 0, the byte budget of an LRU cache for ``read_object``.
+            Only objects requested by full hash (e.g. ``<commit-hash>:<path>``) are cached,
+            hits, misses and evictions are counted in ``Giterator.blob_cache``.
+        :param blob_cache_path: optional str or Path, directory where evicted objects
+            of the ``blob_cache`` are stored and read back from.
+        """
         self.verbose = verbose
         self.path = str(path)
         self._git_args = git_args or []
-        self._num_commits = None
+        self._num_commits = dict()
+        # the commit cache is created on first use
+        self._use_cache = cache
+        self._cache: Optional[CommitCache] = None
         self._hashes = set()
+        self._cat_file: Optional[CatFileBatch] = None
+        self._object_store: Optional[ObjectStore] = ObjectStore(self.path) if object_store else None
+        self.blob_cache: Optional[BlobCache] = (
+            BlobCache(blob_cache, spill_path=blob_cache_path) if blob_cache > 0 else None
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        Stop the background `git cat-file` process, if any.
+        """
+        if self._cat_file is not None:
+            self._cat_file.close()
+        if self._object_store is not None:
+            self._object_store.close()
+
+    def _get_cache(self) -> Optional[CommitCache]:
+        """
+        Returns the commit cache, or None if it is disabled or can not be set up,
+        e.g. outside of a git repository
+        """
+        if self._cache is None and self._use_cache:
+            try:
+                self._cache = CommitCache(self)
+            except ValueError as e:
+                self._log(f"commit cache disabled: {e}")
+                self._use_cache = False
+        return self._cache
 
     def _log(self, *args):
         if self.verbose:
             print(*args, file=sys.stderr)
 
-    def num_commits(self, *filenames: str, all: bool = False) -> int:
-        if self._num_commits is None:
-            args = ["git", "rev-list", "--count"] + self._git_args
-            if all:
-                if "--all" not in self._git_args:
-                    args.append("--all")
+    def num_commits(
+            self,
+            *filenames: str,
+            all: bool = False,
+            revision: Optional[str] = None,
+            first_parent: bool = False,
+    ) -> int:
+        args = ["git", "rev-list", "--count"] + self._git_args
+        if first_parent:
+            args.append("--first-parent")
+        if revision:
+            args.append(revision)
+        elif all:
+            if "--all" not in self._git_args:
+                args.append("--all")
+        else:
+            if "--branches" not in self._git_args:
+                args.append("--branches")
+
+        if filenames:
+            args += ["--"] + list(filenames)
+
+        key = tuple(args)
+        if key not in self._num_commits:
+            cache = self._get_cache()
+            if cache is not None:
+                self._num_commits[key] = cache.num_commits(args)
             else:
-                if "--branches" not in self._git_args:
-                    args.append("--branches")
+                self._log(" ".join(args))
+                self._num_commits[key] = int(subprocess.check_output(args, cwd=self.path))
 
-            if filenames:
-                args += ["--"] + list(filenames)
+        return self._num_commits[key]
 
-            self._log(" ".join(args))
-            output = subprocess.check_output(args, cwd=self.path)
-            self._num_commits = int(output)
+    def rev_parse(self, *revisions: str) -> List[str]:
+        """
+        Resolve revisions to commit hashes via `git rev-parse`.
 
-        return self._num_commits
+        :param revisions: str, revisions or options like ``--branches``
+        :return: list of str
+        """
+        git_cmd = ["git", "rev-parse"] + list(revisions)
+        self._log(" ".join(git_cmd))
+        return subprocess.check_output(git_cmd, cwd=self.path).decode("utf-8").split()
+
+    def is_ancestor(self, ancestor: str, commit: str) -> bool:
+        git_cmd = ["git", "merge-base", "--is-ancestor", ancestor, commit]
+        self._log(" ".join(git_cmd))
+        return subprocess.call(git_cmd, cwd=self.path, stderr=subprocess.DEVNULL) == 0
 
     def first_commit(self, *filenames: Union[str, Path]) -> Optional[Commit]:
         for commit in self.iter_commits(*filenames, reverse=False):
@@ -89,6 +188,9 @@ class Giterator:
             offset: int = 0,
             count: int = 0,
             parse_changes: bool = True,
+            raw: bool = False,
+            revision: Optional[str] = None,
+            first_parent: bool = False,
     ) -> Generator[Commit, None, None]:
         """
         Yields a dictionary for every git log that is found
@@ -106,11 +208,64 @@ class Giterator:
         :param count: int
             If > 0 then stop after this number of commits.
 
+        :param raw: bool
+            If True, also parse ``git log --raw`` output and add the
+            ``old_blob`` and ``new_blob`` hashes to each entry in ``Commit.changes``.
+            They are None for created and deleted files respectively.
+
+        :param revision: optional str
+            A revision or revision range like ``<hash>..HEAD``, defaults to ``HEAD``.
+
+        :param first_parent: bool
+            If True, only follow the first parent of merge commits
+            and list the changes of merges against their first parent.
+
         :return: generator of dict
         """
+        cache = self._get_cache() if revision is None else None
+        if cache is not None:
+            commits = cache.iter_commit_dicts(
+                filenames=[str(f) for f in filenames],
+                parse_changes=parse_changes,
+                raw=raw,
+                first_parent=first_parent,
+            )
+            if reverse:
+                commits = reversed(list(commits))
+            for i, commit in enumerate(commits):
+                if count > 0 and i >= offset + count:
+                    break
+                if i >= offset:
+                    yield Commit(self, **commit)
+            return
+
+        for record in self._iter_commit_records(
+                *filenames,
+                reverse=reverse, offset=offset, count=count,
+                parse_changes=parse_changes, raw=raw, revision=revision, first_parent=first_parent,
+        ):
+            yield Commit.from_log_record(self, record)
+
+    def _log_command(
+            self,
+            *filenames: Union[str, Path],
+            reverse: bool = False,
+            parse_changes: bool = True,
+            raw: bool = False,
+            revision: Optional[str] = None,
+            first_parent: bool = False,
+    ) -> List[str]:
         git_cmd = [
             "git", "log",
         ]
+        if first_parent:
+            # implies --diff-merges=first-parent
+            git_cmd.append("--first-parent")
+        if raw:
+            git_cmd += [
+                "--raw",
+                "--no-abbrev",
+            ]
         if parse_changes:
             git_cmd += [
                 "--numstat",
@@ -125,9 +280,38 @@ class Giterator:
         if not reverse:
             git_cmd.append("--reverse")
 
+        if revision:
+            git_cmd.append(revision)
+
         if filenames:
             git_cmd += ["--"] + [str(f) for f in filenames]
 
+        return git_cmd
+
+    def _iter_commit_dicts(self, *filenames: Union[str, Path], **kwargs) -> Generator[dict, None, None]:
+        for record in self._iter_commit_records(*filenames, **kwargs):
+            yield Commit.from_log_record(self, record).to_dict()
+
+    def _iter_commit_records(
+            self,
+            *filenames: Union[str, Path],
+            reverse: bool = False,
+            offset: int = 0,
+            count: int = 0,
+            parse_changes: bool = True,
+            raw: bool = False,
+            revision: Optional[str] = None,
+            first_parent: bool = False,
+    ) -> Generator[bytes, None, None]:
+        """
+        Yields the raw ``git log`` output of each commit,
+        without the leading delimiter line.
+        """
+        git_cmd = self._log_command(
+            *filenames, reverse=reverse, parse_changes=parse_changes, raw=raw, revision=revision,
+            first_parent=first_parent,
+        )
+
         self._log(" ".join(git_cmd))
         process = subprocess.Popen(
             git_cmd,
@@ -136,55 +320,28 @@ class Giterator:
         )
 
         try:
-            commit = dict()
-            current_line = 0
+            delimiter = self.DELIMITER1.encode()
+            record = None
             cur_count = 0
             while count <= 0 or (cur_count - offset) < count:
                 line = process.stdout.readline()
                 if not line:
                     break
 
-                line = decode(line, ignore_errors=True).rstrip()
-
                 # a new commit starts
-                if line == self.DELIMITER1:
-                    if commit:
+                if line.startswith(delimiter):
+                    if record:
                         if cur_count >= offset:
-                            yield Commit(self, **commit)
+                            yield b"".join(record)
                         cur_count += 1
-                    commit = dict()
-                    current_line = 0
-
-                # commit message ended and changes (numstats) follow
-                elif line == self.DELIMITER2[1:]:
-                    commit["message"] = commit["message"].rstrip()
-                    current_line = -1
-
-                # digest each line
-                else:
-                    if 1 <= current_line <= len(self.LOG_INFOS):
-                        log_info: Tuple = self.LOG_INFOS[current_line - 1]
-                        value = line
-                        if len(log_info) > 2:
-                            value = log_info[2](value)
-                        commit[log_info[1]] = value
-
-                    elif current_line == len(self.LOG_INFOS) + 1:
-                        commit["message"] = line.rstrip()
-                    elif current_line > len(self.LOG_INFOS) + 1:
-                        commit["message"] += "\n" + line.rstrip()
-
-                    elif current_line == -1:
-                        line = line.strip()
-                        if not self._parse_changes(commit, line):
-                            self._parse_summary(commit, line)
-
-                if current_line >= 0:
-                    current_line += 1
-
-            if commit:
+                    record = []
+
+                elif record is not None:
+                    record.append(line)
+
+            if record:
                 if cur_count >= offset and (count <= 0 or (cur_count - offset) < count):
-                    yield Commit(self, **commit)
+                    yield b"".join(record)
 
         finally:
             process.kill()
@@ -197,34 +354,57 @@ class Giterator:
             branch_length: int = 100,
             branch_age: int = 100,
     ) -> Generator[Commit, None, None]:
+        """
+        Yields all commits of ``iter_commits`` but tries to keep
+        commits that follow each other (child after parent) together.
+
+        Commits are collected in branches which are yielded when they
+        get longer than ``branch_length`` or when ``branch_age`` commits
+        have been read since the branch was started.
+        """
+        # branch number -> [step of creation, commit, commit, ...] in order of creation
+        branches: Dict[int, list] = OrderedDict()
+        # hash of the last commit of a branch -> branch number
+        tips: Dict[str, int] = {}
+        step = 0
 
-        branches = []
-        for commit in self.iter_commits(offset=offset, count=count):
+        for number, commit in enumerate(self.iter_commits(offset=offset, count=count)):
             if not commit.parent_hash:
-                branches.append([0, commit])
+                branches[number] = [step, commit]
+                tips[commit.hash] = number
+                continue
+
+            step += 1
+
+            # the oldest branch that ends with one of the parents
+            matches = [tips[h] for h in commit.parent_hash if h in tips]
+            if matches:
+                match = min(matches)
+                branch = branches[match]
+                del tips[branch[-1].hash]
+                branch.append(commit)
+                tips[commit.hash] = match
+
+            # branches are ordered by creation, the aged ones are always at the front
+            flush = []
+            for key, branch in branches.items():
+                if step - branch[0] <= branch_age and branch_length > 0:
+                    break
+                flush.append(key)
 
-            else:
-                added = False
-                new_branches = []
-                for branch in branches:
-                    for parent_hash in commit.parent_hash:
-                        if not added and parent_hash == branch[-1].hash:
-                            branch.append(commit)
-                            added = True
-                            break
-
-                    branch[0] += 1
-                    if len(branch) - 1 > branch_length or branch[0] > branch_age:
-                        yield from branch[1:]
-                    else:
-                        new_branches.append(branch)
+            if matches and match not in flush and len(branches[match]) - 1 > branch_length:
+                flush.append(match)
 
-                branches = new_branches
+            for key in flush:
+                branch = branches.pop(key)
+                del tips[branch[-1].hash]
+                yield from branch[1:]
 
-                if not added:
-                    branches.append([0, commit])
+            if not matches:
+                branches[number] = [step, commit]
+                tips[commit.hash] = number
 
-        for branch in branches:
+        for branch in branches.values():
             yield from branch[1:]
 
     def iter_commit_hashes(
@@ -253,23 +433,7 @@ class Giterator:
                 "parent_hash": [str],
             }
         """
-        git_cmd = [
-            "git", "rev-list",
-            "--children",
-            "--reverse",
-            "--pretty=%aI %T %P"
-        ]
-        if topo_order:
-            git_cmd += ["--topo-order"]
-        if all:
-            if "--all" not in self._git_args:
-                git_cmd.append("--all")
-        else:
-            if "--branches" not in self._git_args:
-                git_cmd.append("--branches")
-
-        if filenames:
-            git_cmd += ["--"] + list(filenames)
+        git_cmd = self._rev_list_command(*filenames, topo_order=topo_order, all=all)
 
         self._log(" ".join(git_cmd))
         process = subprocess.Popen(
@@ -286,15 +450,7 @@ class Giterator:
                 if not line:
                     break
 
-                line = decode(line, ignore_errors=False).split()
-
-                if line[0] == "commit":
-                    commit["hash"] = line[1]
-                    commit["children_hash"] = line[2:]
-                else:
-                    commit["date"] = parse_datetime(line[0])
-                    commit["tree_hash"] = line[1]
-                    commit["parent_hash"] = line[2:]
+                if self._parse_rev_list_line(commit, line):
                     yield commit
                     cur_count += 1
                     commit = dict()
@@ -303,15 +459,57 @@ class Giterator:
             process.kill()
             process.wait()
 
+    def _rev_list_command(self, *filenames: str, topo_order: bool = False, all: bool = False) -> List[str]:
+        git_cmd = [
+            "git", "rev-list",
+            "--children",
+            "--reverse",
+            "--pretty=%aI %T %P"
+        ]
+        if topo_order:
+            git_cmd += ["--topo-order"]
+        if all:
+            if "--all" not in self._git_args:
+                git_cmd.append("--all")
+        else:
+            if "--branches" not in self._git_args:
+                git_cmd.append("--branches")
+
+        if filenames:
+            git_cmd += ["--"] + list(filenames)
+
+        return git_cmd
+
+    def _parse_rev_list_line(self, commit: dict, line: bytes) -> bool:
+        """
+        Parse one line of the `git rev-list` output into ``commit``,
+        returns True when the commit is complete.
+        """
+        line = decode(line, ignore_errors=False).split()
+
+        if line[0] == "commit":
+            commit["hash"] = line[1]
+            commit["children_hash"] = line[2:]
+            return False
+
+        commit["date"] = parse_datetime(line[0])
+        commit["tree_hash"] = line[1]
+        commit["parent_hash"] = line[2:]
+        return True
+
     def iter_files(
             self,
             treeish: str,
             filenames: Optional[Sequence[str]] = None
-    ) -> Generator[Tuple[BytesIO, tarfile.TarInfo], None, None]:
+    ) -> Generator[File, None, None]:
         """
         Iterates through all files at a commit or tree,
         by reading the tar output of `git archive`.
 
+        The tar stream is read while git is still writing it,
+        so only the current file is kept in memory and the first
+        file is yielded before `git archive` has finished.
+
         :param treeish: str
         :param filenames: optional list of paths or filenames
         :return: generator of File
@@ -331,29 +529,193 @@ class Giterator:
         )
 
         try:
-            # TODO: would be nice if we could iterate through
-            #   the files in the stdout stream but
-            #   tarfile lib requires seekable streams
-            #   so the whole tar-file has to be in memory
-
-            tar_data = BytesIO(process.stdout.read())
-            error_response = process.stderr.read()
+            try:
+                tar = tarfile.open(fileobj=process.stdout, mode="r|")
+            except tarfile.ReadError:
+                if not filenames:
+                    return
+                raise tarfile.ReadError(process.stderr.read().decode("utf-8"))
+
+            with tar:
+                for tarinfo in tar:
+                    if tarinfo.isfile():
+                        # members of a stream can only be read while they are current
+                        yield File(self, tarinfo, tar.extractfile(tarinfo).read())
 
         finally:
             process.kill()
             process.wait()
 
-        tar_data.seek(0)
+    def iter_blob_history(
+            self,
+            *paths: Union[str, Path],
+            revision: str = "HEAD",
+            first_parent: bool = False,
+    ) -> Generator[Tuple[str, str, bytes], None, None]:
+        """
+        Yields the content of every changed file in every commit, oldest commit first.
+
+        A single `git fast-export` process streams the commits together with
+        the file contents, which is much cheaper than one `git archive`
+        or `git cat-file` request per commit when walking the whole history.
+        Files that are deleted in a commit are not yielded.
+
+        :param paths: optional paths or directories to restrict the history to
+        :param revision: str, a revision or revision range like ``<hash>..HEAD``
+        :param first_parent: bool, only follow the first parent of merge commits.
+            Merges are always compared against their first parent.
+        :return: generator of tuples of (commit hash, path, content)
+        """
+        git_cmd = [
+            "git", "fast-export",
+            "--show-original-ids",
+            "--reencode=no",
+            "--signed-tags=strip",
+            "--tag-of-filtered-object=drop",
+            "--reference-excluded-parents",
+        ] + self._git_args
+        if first_parent:
+            git_cmd.append("--first-parent")
+        git_cmd.append(revision)
+        if paths:
+            git_cmd += ["--"] + [str(p) for p in paths]
+
+        self._log(" ".join(git_cmd))
+        process = subprocess.Popen(
+            git_cmd,
+            stdout=subprocess.PIPE,
+            cwd=self.path,
+        )
 
         try:
-            for tarinfo in tarfile.open(fileobj=tar_data):
-                if tarinfo.isfile():
-                    yield File(self, tar_data, tarinfo)
+            stream = process.stdout
+            # mark -> object hash of all blobs, and the contents of the blobs
+            #   that were streamed since the last commit, which are the ones it uses
+            blob_hashes = dict()
+            blobs = dict()
+            mark = original_oid = None
+            commit_hash = None
+
+            while True:
+                line = stream.readline()
+                if not line:
+                    break
+                line = line.rstrip(b"\n")
+
+                if line.startswith(b"data "):
+                    # raw data is not line based, so it's read in one piece
+                    data = stream.read(int(line[5:]))
+                    if commit_hash is None and mark is not None:
+                        blob_hashes[mark] = original_oid
+                        blobs[mark] = data
+
+                elif line.startswith(b"mark "):
+                    mark = line[5:].decode("ascii")
+
+                elif line.startswith(b"original-oid "):
+                    original_oid = line[13:].decode("ascii")
+                    if commit_hash is not None:
+                        commit_hash = original_oid
+
+                elif line == b"blob":
+                    if commit_hash is not None:
+                        blobs.clear()
+                    commit_hash = mark = original_oid = None
+
+                elif line.startswith(b"commit "):
+                    # the hash follows in the `original-oid` line
+                    commit_hash = ""
+                    mark = original_oid = None
+
+                elif line.startswith(b"M ") and commit_hash:
+                    mode, dataref, path = line[2:].decode("utf-8", "surrogateescape").split(" ", 2)
+                    if mode == "160000":
+                        # submodule
+                        continue
+                    path = unquote_git_path(path)
+                    if dataref in blobs:
+                        data = blobs[dataref]
+                    else:
+                        # a blob that was streamed for an earlier commit
+                        data = self.read_blob(blob_hashes.get(dataref, dataref))
+                    yield commit_hash, path, data
+
+        finally:
+            process.kill()
+            process.wait()
+
+    def read_object(self, spec: str) -> Optional[Tuple[str, bytes]]:
+        """
+        Read a single object through a persistent `git cat-file --batch` process
+        or, if enabled, directly from the object database.
+
+        :param spec: str, e.g. ``<commit>:<path>`` or an object hash
+        :return: tuple of object type and content or None if not found
+        """
+        if self.blob_cache is not None and self.blob_cache.is_immutable(spec):
+            obj = self.blob_cache.get(spec)
+            if obj is None:
+                obj = self._read_object(spec)
+                if obj is not None:
+                    self.blob_cache.put(spec, *obj)
+            return obj
+
+        return self._read_object(spec)
+
+    def _read_object(self, spec: str) -> Optional[Tuple[str, bytes]]:
+        if self._object_store is not None:
+            try:
+                return self._object_store.read(spec)
+            except ValueError:
+                # revision syntax that only git understands
+                pass
+
+        if self._cat_file is None:
+            self._cat_file = CatFileBatch(self.path, verbose=self.verbose)
+        return self._cat_file.read(spec)
+
+    def read_blob(self, treeish: str, path: Optional[str] = None) -> Optional[bytes]:
+        """
+        Read the content of a file at a commit or tree.
+
+        :param treeish: str, commit or tree, or the blob hash itself if ``path`` is omitted
+        :param path: optional str, path of the file inside ``treeish``
+        :return: bytes or None if the file does not exist
+        """
+        obj = self.read_object(f"{treeish}:{path}" if path else treeish)
+        if obj is not None and obj[0] == "blob":
+            return obj[1]
+
+    def list_tree(self, treeish: str, path: Optional[str] = None) -> List[Tuple[str, str, str]]:
+        """
+        List the entries of a directory at a commit or tree.
+
+        :param treeish: str, commit or tree
+        :param path: optional str, path of the directory inside ``treeish``
+        :return: list of tuples of (mode, name, hash), empty if the directory does not exist
+        """
+        obj = self.read_object(f"{treeish}:{path}" if path else f"{treeish}^{{tree}}")
+        if obj is None or obj[0] != "tree":
+            return []
+        return parse_tree(obj[1])
+
+    def _parse_raw(self, commit: dict, line: str):
+        # :<old mode> <new mode> <old blob> <new blob> <status>\t<name>[\t<new name>]
+        info, *names = line[1:].split("\t")
+        old_mode, new_mode, old_blob, new_blob, status = info.split()
+
+        if "changes" not in commit:
+            commit["changes"] = []
 
-        except tarfile.ReadError:
-            if not filenames:
-                return
-            raise tarfile.ReadError(error_response.decode("utf-8"))
+        change = {
+            "name": names[-1],
+            "type": self.RAW_STATUS_TYPES.get(status[0], "change"),
+            "old_blob": None if old_blob == self.NULL_HASH else old_blob,
+            "new_blob": None if new_blob == self.NULL_HASH else new_blob,
+        }
+        if len(names) > 1:
+            change["old_name"] = names[0]
+        commit["changes"].append(change)
 
     def _parse_changes(self, commit: dict, line: str) -> bool:
         change_match = self.RE_CHANGE_NUMSTATS.match(line)
@@ -367,21 +729,31 @@ class Giterator:
 
         # TODO: additions/deletions should be integer converted
         #   but might be "-" in case of binary files
-        commit["changes"].append({
+        change = {
             "name": name,
             "type": "change",
             "additions": additions,
             "deletions": deletions,
-        })
+        }
 
         rename = get_git_renaming(name)
         if rename:
-            commit["changes"][-1].update({
+            change.update({
                 "name": rename[1],
                 "old_name": rename[0],
                 "type": "rename"
             })
 
+        # in raw mode the entry has already been created by _parse_raw
+        for ch in commit["changes"]:
+            if ch["name"] == change["name"] and "additions" not in ch:
+                ch["additions"] = additions
+                ch["deletions"] = deletions
+                return True
+
+        commit["changes"].append(change)
+        return True
+
     def _parse_summary(self, commit: dict, line: str) -> bool:
         if line.startswith("rename "):
             return True
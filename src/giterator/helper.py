@@ -2,18 +2,20 @@ import os
 import re
 import math
 import datetime
-from typing import Optional, Tuple, List, Any, Sequence, Iterable
-
-import dateutil.parser
-
+import subprocess
+from pathlib import Path
+from typing import Optional, Tuple, List, Any, Sequence, Iterable, Union
 
 RE_MULTI_SLASH = re.compile(r"/+")
 
-_date_parser = dateutil.parser
-
 
 def parse_datetime(s: str) -> datetime.datetime:
-    return _date_parser.parse(s)
+    try:
+        # git's strict ISO format, e.g. `%aI`
+        return datetime.datetime.fromisoformat(s)
+    except ValueError:
+        import dateutil.parser
+        return dateutil.parser.parse(s)
 
 
 def decode(s: bytes, ignore_errors: bool = False) -> Optional[str]:
@@ -50,6 +52,44 @@ def get_git_renaming(name: str) -> Optional[Tuple[str, str]]:
     return RE_MULTI_SLASH.sub("/", name1), RE_MULTI_SLASH.sub("/", name2)
 
 
+def unquote_git_path(path: str) -> str:
+    """
+    Undo git's C-style quoting of paths with special characters,
+    e.g. ``"docs/\\303\\244.txt"``
+    """
+    if len(path) < 2 or not path.startswith('"') or not path.endswith('"'):
+        return path
+    return (
+        path[1:-1].encode("latin1", "backslashreplace")
+        .decode("unicode_escape")
+        .encode("latin1")
+        .decode("utf-8", "surrogateescape")
+    )
+
+
+def get_git_dir(path: Union[str, Path], common: bool = True) -> Path:
+    """
+    Returns the directory containing the git database of the repository at ``path``.
+
+    :param path: str or Path, a directory inside the repository
+    :param common: bool, for worktrees, return the directory shared with the main
+        repository (objects and most refs). If False, return the worktree's
+        own directory, which holds ``HEAD`` and the other per-worktree refs.
+    """
+    try:
+        output = subprocess.check_output(
+            ["git", "rev-parse", "--git-common-dir" if common else "--git-dir"],
+            cwd=str(path), stderr=subprocess.DEVNULL,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        raise ValueError(f"No git repository found at '{path}'")
+
+    git_dir = Path(path) / output.decode("utf-8").strip()
+    if common and not (git_dir / "objects").is_dir():
+        raise ValueError(f"No git object database found at '{path}'")
+    return git_dir.resolve()
+
+
 MEM_SCALE = {
     "kb": 1024,
     "mb": 1024 * 1024,
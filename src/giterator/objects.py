@@ -0,0 +1,422 @@
+import re
+import mmap
+import zlib
+import struct
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Optional, Tuple, List, Dict
+
+from .catfile import parse_tree
+from .helper import get_git_dir
+
+
+class ObjectStore:
+    """
+    Read-only access to the ``.git/objects`` database without running git.
+
+    Loose objects are inflated with zlib, pack files and their (version 2)
+    index files are memory-mapped. Objects in packs are found by a binary search
+    within the fan-out range of the index and OFS/REF delta chains are
+    resolved in python. Resolved delta bases are kept in a small LRU cache
+    because consecutive versions of a file usually share their bases.
+
+    Only plain object hashes, ``HEAD`` and other pseudo refs, full ref names
+    and short ref names (in the order of git's ``gitrevisions`` rules)
+    can be resolved, optionally followed by ``:<path>`` or ``^{tree}``.
+    Other revision syntax and unknown refs raise a ``ValueError``.
+    """
+
+    TYPE_NAMES = {
+        1: "commit",
+        2: "tree",
+        3: "blob",
+        4: "tag",
+    }
+    OFS_DELTA = 6
+    REF_DELTA = 7
+
+    RE_HASH = re.compile(r"[0-9a-f]{40}")
+    RE_PSEUDO_REF = re.compile(r"[A-Z_]+")
+    # refs that are stored separately for each worktree
+    WORKTREE_REFS = ("refs/worktree/", "refs/bisect/", "refs/rewritten/")
+
+    def __init__(self, path: str, cache_size: int = 32 * 1024 * 1024):
+        """
+        :param path: str, the root directory of the repository
+        :param cache_size: int, maximum number of bytes of resolved delta bases to keep
+        """
+        self.git_dir = get_git_dir(path)
+        # the same as git_dir, except in a linked worktree
+        self.worktree_git_dir = get_git_dir(path, common=False)
+        self._objects_dir = str(self.git_dir / "objects")
+        self.cache_size = cache_size
+        self._packs: List["_Pack"] = []
+        self._pack_names = set()
+        self._cache: Dict[Tuple[int, int], Tuple[int, bytes]] = OrderedDict()
+        self._cache_bytes = 0
+        self._lock = threading.RLock()
+        self._load_packs()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            for pack in self._packs:
+                pack.close()
+            self._packs.clear()
+            self._pack_names.clear()
+            self._cache.clear()
+            self._cache_bytes = 0
+
+    def read(self, spec: str) -> Optional[Tuple[str, bytes]]:
+        """
+        Read a single object, same as ``CatFileBatch.read``.
+
+        :param spec: str, ``<revision>``, ``<revision>:<path>`` or ``<revision>^{tree}``
+        :return: tuple of object type and content, or None if the object does not exist
+        """
+        if ":" in spec:
+            revision, path = spec.split(":", 1)
+        else:
+            revision, path = spec, None
+
+        peel_tree = revision.endswith("^{tree}")
+        if peel_tree:
+            revision = revision[:-7]
+
+        hash = self.resolve(revision)
+
+        with self._lock:
+            obj = self.read_hash(hash)
+            if obj is None:
+                return
+
+            if path is not None or peel_tree:
+                obj = self._peel_tree(obj)
+                if obj is None:
+                    return
+
+            if path:
+                for name in path.strip("/").split("/"):
+                    if obj[0] != "tree":
+                        return
+                    for entry_mode, entry_name, entry_hash in parse_tree(obj[1]):
+                        if entry_name == name:
+                            obj = self.read_hash(entry_hash)
+                            break
+                    else:
+                        return
+
+            return obj
+
+    def read_hash(self, hash: str) -> Optional[Tuple[str, bytes]]:
+        """
+        Read an object by its full hash.
+
+        :return: tuple of object type and content, or None if the object does not exist
+        """
+        with self._lock:
+            obj = self._read_loose(hash)
+            if obj is not None:
+                return obj
+
+            obj = self._read_packed(bytes.fromhex(hash))
+            if obj is None and self._load_packs():
+                # somebody might have repacked in the meantime
+                obj = self._read_packed(bytes.fromhex(hash))
+
+            if obj is not None:
+                return self.TYPE_NAMES[obj[0]], obj[1]
+
+    def resolve(self, revision: str) -> str:
+        """
+        Resolve a revision to an object hash.
+
+        :param revision: str, hash, ``HEAD``, full or short ref name
+        :return: str, the hash
+        :raises ValueError: if the revision can not be resolved without git
+        """
+        if self.RE_HASH.fullmatch(revision):
+            return revision
+
+        if revision.startswith("refs/"):
+            candidates = [revision]
+        elif re.fullmatch(r"[\w./-]+", revision) and not re.fullmatch(r"[0-9a-f]{4,39}", revision):
+            candidates = [
+                f"refs/{revision}",
+                f"refs/tags/{revision}",
+                f"refs/heads/{revision}",
+                f"refs/remotes/{revision}",
+                f"refs/remotes/{revision}/HEAD",
+            ]
+            if self.RE_PSEUDO_REF.fullmatch(revision):
+                candidates.insert(0, revision)
+        else:
+            candidates = []
+
+        for ref in candidates:
+            hash = self._read_ref(ref)
+            if hash is not None:
+                return hash
+
+        raise ValueError(f"Can not resolve revision '{revision}' without git")
+
+    def _read_ref(self, ref: str, depth: int = 0) -> Optional[str]:
+        if depth > 5:
+            return
+        if self.RE_PSEUDO_REF.fullmatch(ref) or ref.startswith(self.WORKTREE_REFS):
+            ref_file = self.worktree_git_dir / ref
+        else:
+            ref_file = self.git_dir / ref
+        if ref_file.is_file():
+            content = ref_file.read_text().strip()
+            if content.startswith("ref: "):
+                return self._read_ref(content[5:], depth + 1)
+            if not self.RE_HASH.fullmatch(content):
+                # e.g. FETCH_HEAD
+                raise ValueError(f"Can not read ref '{ref}' without git")
+            return content
+
+        packed_refs = self.git_dir / "packed-refs"
+        if packed_refs.is_file():
+            for line in packed_refs.read_text().splitlines():
+                if line and line[0] not in "#^":
+                    hash, name = line.split(" ", 1)
+                    if name == ref:
+                        return hash
+
+    def _peel_tree(self, obj: Tuple[str, bytes]) -> Optional[Tuple[str, bytes]]:
+        for i in range(10):
+            if obj is None or obj[0] == "tree":
+                return obj
+            if obj[0] not in ("commit", "tag"):
+                return
+            # both start with a "<tree|object> <hash>" line
+            hash = obj[1][:obj[1].index(b"\n")].split()[1].decode("ascii")
+            obj = self.read_hash(hash)
+
+    def _read_loose(self, hash: str) -> Optional[Tuple[str, bytes]]:
+        try:
+            with open(f"{self._objects_dir}/{hash[:2]}/{hash[2:]}", "rb") as fp:
+                data = zlib.decompress(fp.read())
+        except FileNotFoundError:
+            return
+        null = data.index(b"\0")
+        type, size = data[:null].decode("ascii").split()
+        return type, data[null + 1:]
+
+    def _load_packs(self) -> bool:
+        pack_dir = self.git_dir / "objects" / "pack"
+        if not pack_dir.is_dir():
+            return False
+        added = False
+        for idx_file in sorted(pack_dir.glob("*.idx")):
+            if idx_file.name not in self._pack_names and idx_file.with_suffix(".pack").exists():
+                self._packs.append(_Pack(len(self._packs), idx_file))
+                self._pack_names.add(idx_file.name)
+                added = True
+        return added
+
+    def _read_packed(self, hash: bytes) -> Optional[Tuple[int, bytes]]:
+        for pack in self._packs:
+            offset = pack.find(hash)
+            if offset is not None:
+                return self._read_pack_entry(pack, offset)
+
+    def _read_pack_entry(self, pack: "_Pack", offset: int) -> Tuple[int, bytes]:
+        # follow the delta chain down to a full object or a cached base
+        chain = []
+        key = (pack.number, offset)
+        while True:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                type, data = cached
+                break
+
+            type, data_offset, base = pack.read_header(key[1])
+            if type == self.OFS_DELTA:
+                chain.append((key[1], data_offset))
+                key = (pack.number, base)
+            elif type == self.REF_DELTA:
+                chain.append((key[1], data_offset))
+                base_pack, base_offset = self._find_pack_entry(base)
+                key = (base_pack.number, base_offset)
+                if base_pack is not pack:
+                    type, data = self._read_pack_entry(base_pack, base_offset)
+                    break
+            else:
+                data = pack.inflate(data_offset)
+                break
+
+        for delta_offset, data_offset in reversed(chain):
+            # keep the bases, the delta applied last is the requested object
+            self._add_to_cache(key, type, data)
+            data = apply_delta(data, pack.inflate(data_offset))
+            key = (pack.number, delta_offset)
+
+        return type, data
+
+    def _find_pack_entry(self, hash: bytes) -> Tuple["_Pack", int]:
+        for pack in self._packs:
+            offset = pack.find(hash)
+            if offset is not None:
+                return pack, offset
+        raise ValueError(f"Delta base {hash.hex()} not found in any pack")
+
+    def _add_to_cache(self, key: Tuple[int, int], type: int, data: bytes):
+        if key in self._cache or len(data) > self.cache_size:
+            return
+        self._cache[key] = (type, data)
+        self._cache_bytes += len(data)
+        while self._cache_bytes > self.cache_size:
+            _, (_, old_data) = self._cache.popitem(last=False)
+            self._cache_bytes -= len(old_data)
+
+
+class _Pack:
+    """
+    A memory-mapped pack file together with its version 2 index.
+    """
+
+    def __init__(self, number: int, idx_file: Path):
+        self.number = number
+        self._idx_fp = open(idx_file, "rb")
+        self._pack_fp = open(idx_file.with_suffix(".pack"), "rb")
+        self.idx = mmap.mmap(self._idx_fp.fileno(), 0, access=mmap.ACCESS_READ)
+        self.pack = mmap.mmap(self._pack_fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.idx[:8] != b"\377tOc\0\0\0\2":
+            raise ValueError(f"Unsupported pack index format in '{idx_file}'")
+        self.fanout = struct.unpack_from(">256I", self.idx, 8)
+        self.num_objects = self.fanout[-1]
+        self._hash_offset = 8 + 256 * 4
+        self._offset_offset = self._hash_offset + self.num_objects * (20 + 4)
+        self._large_offset_offset = self._offset_offset + self.num_objects * 4
+
+    def close(self):
+        self.idx.close()
+        self.pack.close()
+        self._idx_fp.close()
+        self._pack_fp.close()
+
+    def find(self, hash: bytes) -> Optional[int]:
+        """
+        Returns the offset of the object in the pack file or None
+        """
+        lo = self.fanout[hash[0] - 1] if hash[0] else 0
+        hi = self.fanout[hash[0]]
+        idx = self.idx
+        while lo < hi:
+            mid = (lo + hi) // 2
+            pos = self._hash_offset + mid * 20
+            mid_hash = idx[pos:pos + 20]
+            if mid_hash < hash:
+                lo = mid + 1
+            elif mid_hash > hash:
+                hi = mid
+            else:
+                offset = struct.unpack_from(">I", idx, self._offset_offset + mid * 4)[0]
+                if offset & 0x80000000:
+                    offset = struct.unpack_from(
+                        ">Q", idx, self._large_offset_offset + (offset & 0x7fffffff) * 8
+                    )[0]
+                return offset
+
+    def read_header(self, offset: int) -> Tuple[int, int, Optional[object]]:
+        """
+        Returns type, offset of the compressed data and the delta base
+        (offset for OFS_DELTA, hash for REF_DELTA, else None)
+        """
+        pack = self.pack
+        entry_offset = offset
+        c = pack[offset]
+        type = (c >> 4) & 7
+        offset += 1
+        # skip the remaining bytes of the object size
+        while c & 0x80:
+            c = pack[offset]
+            offset += 1
+
+        base = None
+        if type == ObjectStore.OFS_DELTA:
+            c = pack[offset]
+            offset += 1
+            distance = c & 0x7f
+            while c & 0x80:
+                c = pack[offset]
+                offset += 1
+                distance = ((distance + 1) << 7) | (c & 0x7f)
+            base = entry_offset - distance
+        elif type == ObjectStore.REF_DELTA:
+            base = bytes(pack[offset:offset + 20])
+            offset += 20
+
+        return type, offset, base
+
+    def inflate(self, offset: int) -> bytes:
+        decompressor = zlib.decompressobj()
+        chunks = []
+        chunk_size = 64 * 1024
+        while not decompressor.eof:
+            chunk = self.pack[offset:offset + chunk_size]
+            if not chunk:
+                raise ValueError(f"Truncated object in pack at offset {offset}")
+            chunks.append(decompressor.decompress(chunk))
+            offset += len(chunk)
+            chunk_size = min(chunk_size * 2, 16 * 1024 * 1024)
+        return b"".join(chunks)
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        c = data[pos]
+        pos += 1
+        value |= (c & 0x7f) << shift
+        shift += 7
+        if not c & 0x80:
+            return value, pos
+
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    """
+    Apply a git pack delta to its base object.
+    """
+    source_size, pos = _read_varint(delta, 0)
+    target_size, pos = _read_varint(delta, pos)
+    if source_size != len(base):
+        raise ValueError(f"Delta expects base of {source_size} bytes, got {len(base)}")
+
+    out = bytearray()
+    length = len(delta)
+    while pos < length:
+        cmd = delta[pos]
+        pos += 1
+        if cmd & 0x80:
+            # copy from base
+            offset = size = 0
+            for i in range(4):
+                if cmd & (1 << i):
+                    offset |= delta[pos] << (i * 8)
+                    pos += 1
+            for i in range(3):
+                if cmd & (0x10 << i):
+                    size |= delta[pos] << (i * 8)
+                    pos += 1
+            out += base[offset:offset + (size or 0x10000)]
+        elif cmd:
+            # insert literal data
+            out += delta[pos:pos + cmd]
+            pos += cmd
+        else:
+            raise ValueError("Invalid delta instruction 0")
+
+    if len(out) != target_size:
+        raise ValueError(f"Delta produced {len(out)} bytes, expected {target_size}")
+    return bytes(out)
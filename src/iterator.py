@@ -1,17 +1,375 @@
 import json
-import tarfile
+import time
+import heapq
+import collections
+import queue
+import bisect
+import datetime
+import itertools
+import threading
+import concurrent.futures
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Tuple, List, Iterable, Generator
+from typing import Optional, Tuple, List, Iterable, Generator, Union, Dict, Callable
 
 from tqdm import tqdm
 
-from .teletext import Teletext, TeletextPage
+from .teletext import Teletext, LineInternTable
 from .giterator import Giterator
+from .giterator.helper import parse_datetime
+
+
+class SnapshotRepository:
+    """
+    One teletext archive repository and its ``_timestamps.ndjson`` index
+    """
+
+    def __init__(
+            self,
+            root: Union[str, Path],
+            snapshot_path: str,
+            blob_cache: int = 0,
+            intern_table: Optional[LineInternTable] = None,
+            commit_cache: bool = False,
+    ):
+        self.root = Path(root)
+        self.snapshot_path = snapshot_path
+        self.git = Giterator(self.root, cache=commit_cache, blob_cache=blob_cache)
+        self.intern_table = intern_table
+        self._timestamps: Optional[List[Tuple[str, str]]] = None
+        self._timestamp_map: Optional[Dict[str, str]] = None
+        # seconds spent waiting for prefetched snapshots
+        self.stall_seconds = 0.
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.root})"
+
+    def get_commit_timestamps(self) -> List[Tuple[str, str]]:
+        """
+        Returns the timestamps and hashes of ``_timestamps.ndjson``,
+        sorted by timestamp
+        """
+        if self._timestamps is None:
+            self._timestamps = []
+            filename = self.root / self.snapshot_path / "_timestamps.ndjson"
+            if filename.exists():
+                for line in filename.read_text().splitlines():
+                    if line:
+                        entry = json.loads(line)
+                        self._timestamps.append((entry["timestamp"], entry["hash"]))
+                self._timestamps.sort()
+        return self._timestamps
+
+    def get_timestamp(self, commit_hash: str) -> Optional[str]:
+        """
+        Returns the indexed timestamp of the commit (or a hash prefix)
+        """
+        if self._timestamp_map is None:
+            self._timestamp_map = {h: t for t, h in self.get_commit_timestamps()}
+        timestamp = self._timestamp_map.get(commit_hash)
+        if timestamp is None and len(commit_hash) < 40:
+            for h, t in self._timestamp_map.items():
+                if h.startswith(commit_hash):
+                    return t
+        return timestamp
+
+    def has_commit(self, commit_hash: str) -> bool:
+        if self.get_timestamp(commit_hash) is not None:
+            return True
+        obj = self.git.read_object(f"{commit_hash}^{{commit}}")
+        return obj is not None
+
+    def get_revision_range(
+            self,
+            after_hash: Optional[str] = None,
+            since: Union[None, str, datetime.datetime] = None,
+            until: Union[None, str, datetime.datetime] = None,
+    ) -> Optional[str]:
+        """
+        Convert the arguments of ``TeletextIterator.iter_teletexts`` into a git revision range.
+
+        ``since`` and ``until`` are bisected in ``_timestamps.ndjson``.
+        Commits that are newer than the last indexed one are
+        included if ``until`` is after the last indexed timestamp.
+
+        :return: None for the whole history, an empty string if there is nothing
+            to iterate, else a revision range like ``<hash>..<hash>``
+        """
+        if after_hash and since is not None:
+            raise ValueError("Use either `after_hash` or `since`, not both")
+
+        if after_hash is None and since is None and until is None:
+            return None
+
+        if since is not None and until is not None and _timestamp_str(since) > _timestamp_str(until):
+            return ""
+
+        entries = self.get_commit_timestamps()
+        timestamps = [t[0] for t in entries]
+        hashes = [t[1] for t in entries]
+
+        first_hash = after_hash
+        if since is not None:
+            index = bisect.bisect_left(timestamps, _timestamp_str(since))
+            if index > 0:
+                first_hash = hashes[index - 1]
+
+        last_hash = "HEAD"
+        if until is not None:
+            index = bisect.bisect_right(timestamps, _timestamp_str(until))
+            if index == 0:
+                return ""
+            if index < len(hashes):
+                last_hash = hashes[index - 1]
+
+        return f"{first_hash}..{last_hash}" if first_hash else last_hash
+
+    def iter_commit_teletexts(
+            self,
+            channels: List[str],
+            revision: Optional[str] = None,
+            changed_only: bool = False,
+            executor: Optional[ProcessPoolExecutor] = None,
+            shard_size: int = 16,
+            max_pending: int = 2,
+            ordered: bool = True,
+            prefetch: int = 0,
+            prefetch_bytes: int = 256 * 1024 * 1024,
+            reuse_pages: bool = False,
+    ) -> Generator[Tuple[str, List[Teletext]], None, None]:
+        """
+        Yields a timestamp and the Teletexts of each commit, oldest first.
+
+        The timestamp is taken from the index, for commits that are
+        not indexed yet it's the earliest snapshot timestamp.
+
+        If ``changed_only`` is True, only the snapshots that changed in a commit
+        are yielded and all of them are streamed by one `git fast-export` process.
+        Only the first parent of merge commits is followed and merges yield the
+        snapshots that changed against their first parent.
+
+        If an ``executor`` is given, the commits are split into shards
+        of ``shard_size`` consecutive commits which are read and parsed
+        in the worker processes. At most ``max_pending`` shards are
+        submitted at once. If ``ordered`` is False, shards are yielded
+        in the order they are finished.
+
+        Otherwise, if ``prefetch`` is > 0, the snapshots of the next ``prefetch``
+        commits are read by background threads while the current one is processed,
+        as long as they are not more than ``prefetch_bytes``. The size of a read
+        in flight is estimated from the last read size of the same files.
+
+        If ``reuse_pages`` is True, pages that did not change since the previous
+        commit are not decoded again and the previous ``TeletextPage`` objects are
+        yielded, see the ``previous`` argument of ``Teletext.from_ndjson``.
+        With an ``executor`` this only applies within each shard.
+        """
+        previous = dict() if reuse_pages else None
+        if executor is None:
+            commit_files = self._iter_snapshot_files(revision, changed_only)
+            if prefetch > 0:
+                commit_files = self._prefetch_snapshot_files(commit_files, channels, prefetch, prefetch_bytes)
+            batches = (
+                (commit_hash, _read_teletexts(files, channels, commit_hash, self.intern_table, previous))
+                for commit_hash, files in commit_files
+            )
+        else:
+            batches = self._iter_commit_teletexts_parallel(
+                channels, revision, changed_only, executor, shard_size, max_pending, ordered, reuse_pages,
+            )
+
+        timestamp = ""
+        for commit_hash, teletexts in batches:
+            timestamp = (
+                self.get_timestamp(commit_hash)
+                or min((tt.timestamp for tt in teletexts if tt.timestamp), default=None)
+                or timestamp
+            )
+            yield timestamp, teletexts
+
+    def _iter_commit_teletexts_parallel(
+            self,
+            channels: List[str],
+            revision: Optional[str],
+            changed_only: bool,
+            executor: ProcessPoolExecutor,
+            shard_size: int,
+            max_pending: int,
+            ordered: bool,
+            reuse_pages: bool,
+    ) -> Generator[Tuple[str, List[Teletext]], None, None]:
+        pending = collections.deque()
+        try:
+            for shard in self._iter_shards(revision, changed_only, shard_size):
+                pending.append(executor.submit(
+                    _read_shard, str(self.root), self.snapshot_path, channels, shard, reuse_pages,
+                ))
+
+                while len(pending) >= max(1, max_pending):
+                    if ordered:
+                        yield from pending.popleft().result()
+                    else:
+                        done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                        for future in done:
+                            pending.remove(future)
+                            yield from future.result()
+
+            while pending:
+                if ordered:
+                    yield from pending.popleft().result()
+                else:
+                    for future in concurrent.futures.as_completed(list(pending)):
+                        pending.remove(future)
+                        yield from future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _iter_shards(
+            self,
+            revision: Optional[str],
+            changed_only: bool,
+            shard_size: int,
+    ) -> Generator[List[Tuple[str, Optional[List[Tuple[str, str]]]]], None, None]:
+        """
+        Yields lists of ``shard_size`` commit hashes along with the filenames
+        and blob hashes of their changed snapshots if ``changed_only``.
+
+        The changes are the same as in ``_iter_snapshot_files``, commits
+        without changed snapshots are skipped.
+        """
+        shard = []
+        for commit in self.git.iter_commits(
+                self.snapshot_path, revision=revision, parse_changes=False,
+                raw=changed_only, first_parent=changed_only,
+        ):
+            files = None
+            if changed_only:
+                files = []
+                for change in commit.changes:
+                    name = _snapshot_file_name(change["name"], self.snapshot_path)
+                    if change["new_blob"] and name is not None:
+                        files.append((name, change["new_blob"]))
+                if not files:
+                    continue
+
+            shard.append((commit.hash, files))
+            if len(shard) >= shard_size:
+                yield shard
+                shard = []
+
+        if shard:
+            yield shard
+
+    def _iter_snapshot_files(
+            self,
+            revision: Optional[str],
+            changed_only: bool,
+    ) -> Generator[Tuple[str, List[Tuple[str, Callable[[], bytes]]]], None, None]:
+        """
+        Yields the commit hash and the filenames and content getters of each commit
+        """
+        if changed_only:
+            history = self.git.iter_blob_history(
+                self.snapshot_path, revision=revision or "HEAD", first_parent=True,
+            )
+            for commit_hash, files in itertools.groupby(history, key=lambda f: f[0]):
+                files = [
+                    (_snapshot_file_name(path, self.snapshot_path), data)
+                    for _, path, data in files
+                ]
+                files = [(name, lambda data=data: data) for name, data in files if name is not None]
+                if files:
+                    yield commit_hash, files
+        else:
+            for commit in self.git.iter_commits(self.snapshot_path, revision=revision):
+                yield commit.hash, [
+                    (name, lambda blob_hash=blob_hash: self.git.read_blob(blob_hash))
+                    for mode, name, blob_hash in self.git.list_tree(commit.hash, self.snapshot_path)
+                ]
+
+    def _prefetch_snapshot_files(
+            self,
+            commit_files: Iterable[Tuple[str, List[Tuple[str, Callable[[], bytes]]]]],
+            channels: List[str],
+            prefetch: int,
+            prefetch_bytes: int,
+    ) -> Generator[Tuple[str, List[Tuple[str, Callable[[], bytes]]]], None, None]:
+
+        def _fetch(files: List[Tuple[str, Callable[[], bytes]]]) -> List[Tuple[str, bytes]]:
+            return [
+                (name, data())
+                for name, data in files
+                if _is_snapshot_file(name, channels)
+            ]
+
+        # last read size of each snapshot file, the estimate for reads in flight
+        sizes: Dict[str, int] = {}
+
+        def _result(future: concurrent.futures.Future) -> List[Tuple[str, bytes]]:
+            files = future.result()
+            for name, data in files:
+                sizes[name] = len(data)
+            return files
+
+        def _estimate(files: List[Tuple[str, Callable[[], bytes]]]) -> int:
+            names = [name for name, _ in files if _is_snapshot_file(name, channels)]
+            if pending and any(name not in sizes for name in names):
+                # wait for the reads in flight to learn the sizes
+                concurrent.futures.wait([future for _, future, _ in pending])
+                for _, future, _ in pending:
+                    if not future.exception():
+                        _result(future)
+            return sum(sizes.get(name, 0) for name in names)
+
+        def _pending_bytes() -> int:
+            return sum(
+                sum(len(data) for _, data in future.result())
+                if future.done() and not future.exception() else estimate
+                for _, future, estimate in pending
+            )
+
+        def _next() -> Tuple[str, List[Tuple[str, Callable[[], bytes]]]]:
+            commit_hash, future, _ = pending.popleft()
+            if not future.done():
+                start = time.perf_counter()
+                concurrent.futures.wait([future])
+                self.stall_seconds += time.perf_counter() - start
+            return commit_hash, [
+                (name, lambda data=data: data)
+                for name, data in _result(future)
+            ]
+
+        pending = collections.deque()
+        pool = ThreadPoolExecutor(max_workers=min(prefetch, 4))
+        try:
+            for commit_hash, files in commit_files:
+                # the size is reserved before the read starts,
+                # the next commit is always read, even if it exceeds the limit alone
+                estimate = _estimate(files)
+                while pending and _pending_bytes() + estimate > prefetch_bytes:
+                    yield _next()
+
+                pending.append((commit_hash, pool.submit(_fetch, files), estimate))
+                while len(pending) > prefetch:
+                    yield _next()
+
+            while pending:
+                yield _next()
+
+        finally:
+            for _, future, _ in pending:
+                future.cancel()
+            pool.shutdown(wait=True)
 
 
 class TeletextIterator:
     """
     Access to Teletext instances throughout the git history
+
+    Several archive repositories (e.g. the different teletext-archive years)
+    can be passed as ``roots``. Their histories are merged into
+    one stream, ordered by the snapshot timestamps.
     """
 
     PROJECT_ROOT: Path = Path(__file__).resolve().parent.parent
@@ -21,66 +379,355 @@ class TeletextIterator:
             self,
             channels: Optional[Iterable[str]] = None,
             verbose: bool = True,
+            roots: Optional[Iterable[Union[str, Path]]] = None,
+            read_ahead: int = 2,
+            blob_cache: int = 0,
+            workers: int = 0,
+            shard_size: int = 16,
+            prefetch: int = 0,
+            prefetch_bytes: int = 256 * 1024 * 1024,
+            intern_lines: int = 0,
+            reuse_pages: bool = False,
+            commit_cache: bool = False,
     ):
+        """
+        :param channels: optional list of str, only yield these channels
+        :param verbose: bool, show a progress bar
+        :param roots: optional list of repository paths, defaults to this repository
+        :param read_ahead: int, number of commits that are read in advance
+            by a background thread for each repository, if there is more than one
+        :param blob_cache: int, byte budget of the ``Giterator`` blob cache of each repository,
+            useful for repeated access to the same snapshots
+        :param workers: int, if > 0, read and parse the snapshots in this number of processes
+        :param shard_size: int, number of consecutive commits handled by one worker task
+        :param prefetch: int, if > 0 (and no ``workers``), read the snapshots of this number
+            of upcoming commits in background threads while the current commit is processed.
+            The time spent waiting for them is shown as ``stall`` in the progress bar.
+        :param prefetch_bytes: int, maximum size of the prefetched snapshots.
+            Reads in flight count with the last read size of the same files
+            and the next commit is always read, even if it is larger.
+        :param intern_lines: int, if > 0, identical page lines of all snapshots that are
+            read in this process share the same objects, see ``LineInternTable``.
+            This is the maximum number of distinct lines that are remembered.
+        :param reuse_pages: bool, only decode the pages that changed since the previous commit
+            of the same snapshot, the unchanged ``TeletextPage`` objects are yielded again.
+            The same page objects are then part of several yielded snapshots,
+            so modifying a page changes it in the later snapshots as well.
+        :param commit_cache: bool, keep the commit log of each repository in its
+            ``.git`` directory, so later runs only parse the new commits (see ``CommitCache``)
+        """
         self.channels: List[str] = [] if channels is None else list(channels)
         self.verbose = verbose
-        self.git = Giterator(self.PROJECT_ROOT)
+        self.read_ahead = read_ahead
+        self.workers = workers
+        self.shard_size = shard_size
+        self.prefetch = prefetch
+        self.prefetch_bytes = prefetch_bytes
+        self.reuse_pages = reuse_pages
+        self.intern_table = LineInternTable(intern_lines) if intern_lines > 0 else None
+        self.repositories: List[SnapshotRepository] = [
+            SnapshotRepository(
+                root, self.SNAPSHOT_PATH,
+                blob_cache=blob_cache, intern_table=self.intern_table, commit_cache=commit_cache,
+            )
+            for root in (roots or [self.PROJECT_ROOT])
+        ]
+        self.git = self.repositories[0].git
 
     def iter_teletexts(
             self,
             after_hash: Optional[str] = None,
+            since: Union[None, str, datetime.datetime] = None,
+            until: Union[None, str, datetime.datetime] = None,
+            changed_only: bool = False,
+            ordered: bool = True,
     ) -> Generator[Teletext, None, None]:
+        """
+        Yields the Teletext of each channel for every commit, oldest first.
 
-        commit_iterable = self.git.iter_commits(self.SNAPSHOT_PATH)
-        if self.verbose:
-            commit_iterable = tqdm(
-                commit_iterable,
-                desc=f"commits",
-                total=self.git.num_commits(self.SNAPSHOT_PATH),
+        :param after_hash: optional str, only yield commits after this one
+        :param since: optional str or datetime, only yield snapshots from this time on
+        :param until: optional str or datetime, only yield snapshots up to this time.
+            Strings are parsed like datetimes. The snapshot timestamps are UTC,
+            naive values are taken as UTC and aware ones are converted.
+        :param changed_only: bool, only yield the snapshots that changed in each commit,
+            read in a single pass through `git fast-export`
+            (or by the worker processes if ``workers`` is set).
+            Only the first parent of merge commits is followed.
+        :param ordered: bool, if False and ``workers`` is set, the commits are yielded
+            in the order the workers finish them, for results that do not depend on the order
+        """
+        executor = ProcessPoolExecutor(self.workers) if self.workers > 0 else None
+        teletexts = self._iter_teletexts(after_hash, since, until, changed_only, ordered, executor)
+        try:
+            yield from teletexts
+        finally:
+            # the streams cancel their pending shards when closed
+            teletexts.close()
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+    def _iter_teletexts(
+            self,
+            after_hash: Optional[str],
+            since: Union[None, str, datetime.datetime],
+            until: Union[None, str, datetime.datetime],
+            changed_only: bool,
+            ordered: bool,
+            executor: Optional[ProcessPoolExecutor],
+    ) -> Generator[Teletext, None, None]:
+        ordered = ordered or executor is None
+        streams = []
+        total = 0
+        for repo in self.repositories:
+            repo.stall_seconds = 0.
+        for repo, revision in zip(self.repositories, self.get_revision_ranges(after_hash, since, until)):
+            if revision == "":
+                continue
+
+            stream = repo.iter_commit_teletexts(
+                self.channels, revision=revision, changed_only=changed_only,
+                executor=executor, shard_size=self.shard_size, max_pending=self.workers * 2,
+                ordered=ordered, prefetch=self.prefetch, prefetch_bytes=self.prefetch_bytes,
+                reuse_pages=self.reuse_pages,
             )
+            if ordered and self.read_ahead > 0 and len(self.repositories) > 1:
+                stream = _read_ahead(stream, self.read_ahead)
+            streams.append(stream)
+
+            if self.verbose:
+                total += repo.git.num_commits(
+                    self.SNAPSHOT_PATH, revision=revision, first_parent=changed_only,
+                )
+
+        if len(streams) == 1:
+            batches = streams[0]
+        elif ordered:
+            batches = heapq.merge(*streams, key=lambda b: b[0])
+        else:
+            batches = itertools.chain(*streams)
+
+        if self.verbose:
+            batches = tqdm(batches, desc=f"commits", total=total)
+
+        since = None if since is None else _timestamp_str(since)
+        until = None if until is None else _timestamp_str(until)
+        try:
+            for timestamp, teletexts in batches:
+                if self.verbose and self.prefetch > 0 and executor is None:
+                    batches.set_postfix(
+                        stall=f"{sum(r.stall_seconds for r in self.repositories):.1f}s",
+                        refresh=False,
+                    )
 
-        yield_files = after_hash is None
+                # commits that are not indexed yet are only filtered here
+                if since is not None and timestamp < since:
+                    continue
+                if until is not None and timestamp > until:
+                    if ordered:
+                        break
+                    continue
+                yield from teletexts
+        finally:
+            for stream in streams:
+                stream.close()
 
-        for commit in commit_iterable:
+    def get_revision_ranges(
+            self,
+            after_hash: Optional[str] = None,
+            since: Union[None, str, datetime.datetime] = None,
+            until: Union[None, str, datetime.datetime] = None,
+    ) -> List[Optional[str]]:
+        """
+        Returns the result of ``SnapshotRepository.get_revision_range`` for each repository.
+
+        With several repositories, ``after_hash`` applies to the repository
+        that contains it and is converted to its indexed timestamp for the others.
+        """
+        if not after_hash or len(self.repositories) == 1:
+            return [
+                repo.get_revision_range(after_hash=after_hash, since=since, until=until)
+                for repo in self.repositories
+            ]
 
-            if yield_files:
-                for file in commit.iter_files(self.SNAPSHOT_PATH):
-                    name = file.name.split("/")[-1]
-                    if not name.endswith(".ndjson") or name.startswith("_"):
-                        continue
+        for repo in self.repositories:
+            if repo.has_commit(after_hash):
+                owner = repo
+                break
+        else:
+            raise ValueError(f"Commit '{after_hash}' not found in {self.repositories}")
 
-                    channel = name.split(".")[0]
-                    if self.channels and channel not in self.channels:
-                        continue
+        timestamp = owner.get_timestamp(after_hash)
+        if timestamp is None:
+            raise ValueError(f"Commit '{after_hash}' is not in the timestamps index of {owner}")
 
-                    tt = Teletext.from_ndjson(file.data)
-                    tt.commit_hash = commit.hash
-                    yield tt
+        return [
+            repo.get_revision_range(after_hash=after_hash, until=until)
+            if repo is owner else
+            repo.get_revision_range(since=timestamp, until=until)
+            for repo in self.repositories
+        ]
 
-            if after_hash and commit.hash.startswith(after_hash):
-                yield_files = True
+    def get_commit_timestamps(self) -> List[Tuple[str, str]]:
+        """
+        Returns the timestamps and hashes of all repository indexes, sorted by timestamp
+        """
+        return list(heapq.merge(*(repo.get_commit_timestamps() for repo in self.repositories)))
 
     def iter_commit_timestamps(self, after_hash: Optional[str] = None) -> Generator[Tuple[str, str], None, None]:
         """
-        Yields the timestamp and the hash of each data commit
+        Yields the timestamp and the hash of each data commit of the first repository
         """
         yield_commits = after_hash is None
         for commit in self.git.iter_commit_hashes(f"{self.SNAPSHOT_PATH}/zdf.ndjson"):
             if yield_commits:
-                file = list(self.git.iter_files(commit["hash"], [f"{self.SNAPSHOT_PATH}/zdf.ndjson"]))[0]
-                header = json.loads(file.data.decode("utf-8").split("\n", 1)[0])
+                data = self.git.read_blob(commit["hash"], f"{self.SNAPSHOT_PATH}/zdf.ndjson")
+                # only the file header is needed, not the whole snapshot
+                header, _ = Teletext.scan_headers(data, pages=False)
                 yield header["timestamp"], commit["hash"]
 
             if after_hash and commit["hash"].startswith(after_hash):
                 yield_commits = True
 
-    def get_historic_teletext(self, channel: str, commit_hash: str) -> Optional[Teletext]:
+    def get_historic_teletext(self, channel: str, commit_hash: str, lazy: bool = False) -> Optional[Teletext]:
+        repositories = sorted(self.repositories, key=lambda r: r.get_timestamp(commit_hash) is None)
+        for repo in repositories:
+            data = repo.git.read_blob(commit_hash, f"{self.SNAPSHOT_PATH}/{channel}.ndjson")
+            if data is not None:
+                tt = Teletext.from_ndjson(data, lazy=lazy, intern_table=self.intern_table)
+                tt.commit_hash = commit_hash
+                return tt
+
+
+def _snapshot_file_name(path: str, snapshot_path: str) -> Optional[str]:
+    """
+    Returns the file name if ``path`` is directly inside ``snapshot_path``, like ``git ls-tree``
+    """
+    directory, _, name = path.rpartition("/")
+    if directory == snapshot_path.strip("/"):
+        return name
+
+
+def _is_snapshot_file(name: str, channels: List[str]) -> bool:
+    if not name.endswith(".ndjson") or name.startswith("_"):
+        return False
+
+    channel = name.split(".")[0]
+    return not channels or channel in channels
+
+
+def _read_teletexts(
+        files: List[Tuple[str, Callable[[], bytes]]],
+        channels: List[str],
+        commit_hash: str,
+        intern_table: Optional[LineInternTable] = None,
+        previous: Optional[Dict[str, Teletext]] = None,
+) -> List[Teletext]:
+    """
+    Parse the snapshot files of one commit.
+
+    If ``previous`` is given, it maps the file names to the previously read
+    snapshots, whose unchanged pages are reused. It is updated with the new ones.
+    """
+    teletexts = []
+    for name, data in files:
+        if not _is_snapshot_file(name, channels):
+            continue
+
+        if previous is None:
+            tt = Teletext.from_ndjson(data(), intern_table=intern_table)
+        else:
+            tt = Teletext.from_ndjson(
+                data(), intern_table=intern_table, previous=previous.get(name) or Teletext(),
+            )
+            previous[name] = tt
+        tt.commit_hash = commit_hash
+        teletexts.append(tt)
+
+    return teletexts
+
+
+# the Giterator instances of a worker process, by repository root
+_worker_gits: Dict[str, Giterator] = {}
+
+
+def _read_shard(
+        root: str,
+        snapshot_path: str,
+        channels: List[str],
+        shard: List[Tuple[str, Optional[List[Tuple[str, str]]]]],
+        reuse_pages: bool = False,
+) -> List[Tuple[str, List[Teletext]]]:
+    """
+    Read and parse the snapshots of a list of commits, runs in a worker process
+    """
+    if root not in _worker_gits:
+        _worker_gits[root] = Giterator(root)
+    git = _worker_gits[root]
+
+    previous = dict() if reuse_pages else None
+    batches = []
+    for commit_hash, files in shard:
+        if files is None:
+            files = [(name, blob_hash) for mode, name, blob_hash in git.list_tree(commit_hash, snapshot_path)]
+        files = [
+            (name, lambda blob_hash=blob_hash: git.read_blob(blob_hash))
+            for name, blob_hash in files
+        ]
+        batches.append((commit_hash, _read_teletexts(files, channels, commit_hash, previous=previous)))
+
+    return batches
+
+
+def _read_ahead(iterable: Iterable, size: int) -> Generator:
+    """
+    Iterate ``iterable`` in a background thread, keeping up to ``size`` items in advance
+    """
+    items = queue.Queue(maxsize=size)
+    stop = threading.Event()
+
+    def _put(item) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _worker():
         try:
-            files = list(self.git.iter_files(commit_hash, [f"docs/snapshots/{channel}.ndjson"]))
-        except tarfile.ReadError:
-            return
-        if files:
-            tt = Teletext.from_ndjson(files[0].data)
-            tt.commit_hash = commit_hash
-            return tt
+            for item in iterable:
+                if not _put((True, item)):
+                    return
+            _put((False, None))
+        except BaseException as e:
+            _put((False, e))
+        finally:
+            if hasattr(iterable, "close"):
+                iterable.close()
 
+    thread = threading.Thread(target=_worker, daemon=True)
+    thread.start()
+    try:
+        while True:
+            ok, item = items.get()
+            if not ok:
+                if item is not None:
+                    raise item
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _timestamp_str(timestamp: Union[str, datetime.datetime]) -> str:
+    """
+    Convert to the format of the snapshot timestamps, which are naive UTC
+    """
+    if isinstance(timestamp, str):
+        timestamp = parse_datetime(timestamp)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return timestamp.isoformat(timespec="seconds")
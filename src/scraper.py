@@ -1,6 +1,5 @@
 import os
 import sys
-import json
 import glob
 import datetime
 import time
@@ -10,7 +9,7 @@ from typing import Generator, Tuple, Union, Optional, Any
 import requests
 import bs4
 
-from .teletext import Teletext, TeletextPage
+from .teletext import Teletext, TeletextPage, codec
 
 scraper_classes = dict()
 
@@ -124,7 +123,7 @@ class Scraper:
             header = {
                 "scraper": self.NAME, "timestamp": datetime.datetime.utcnow().replace(microsecond=0).isoformat()
             }
-            print(json.dumps(header, ensure_ascii=False, separators=(',', ':')), file=fp)
+            print(codec.dumps(header), file=fp)
 
             for page_num, sub_page_num, content in self.iter_pages():
                 retrieved_set.add((page_num, sub_page_num))
@@ -58,7 +58,7 @@ class SR(Scraper):
         if len(old.lines) < 1:
             return False
         # compare pages without the first line which includes the current date and time
-        return old.lines[1:] == new.lines[1:]
+        return old.line_hashes[1:] == new.line_hashes[1:]
 
     def to_teletext(self, content: bs4.BeautifulSoup) -> TeletextPage:
         tt = TeletextPage()
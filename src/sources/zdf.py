@@ -86,7 +86,7 @@ class ZDFBase(Scraper):
         if len(old.lines) < 1:
             return False
         # compare pages without the first line which includes the current date and time
-        return old.lines[1:] == new.lines[1:]
+        return old.line_hashes[1:] == new.line_hashes[1:]
 
     def to_teletext(self, content: Union[str, bs4.BeautifulSoup]) -> TeletextPage:
         if isinstance(content, str):
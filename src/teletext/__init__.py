@@ -1,2 +1,3 @@
 from .page import TeletextPage
 from .teletext import Teletext
+from .intern import LineInternTable
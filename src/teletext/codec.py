@@ -0,0 +1,71 @@
+"""
+JSON encoding and decoding of the ndjson snapshot format.
+
+Uses ``orjson`` or ``msgspec`` if installed and falls back to the
+``json`` module. The encoded output is always the same as
+``json.dumps(obj, ensure_ascii=False, separators=(",", ":"))``,
+so snapshot files do not change with the installed packages.
+"""
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover
+    msgspec = None
+
+
+if orjson is not None:
+    DECODER = "orjson"
+elif msgspec is not None:
+    DECODER = "msgspec"
+else:
+    DECODER = "json"
+
+# only orjson's output was checked to be identical to `json`,
+#   msgspec is used for decoding only
+ENCODER = "orjson" if orjson is not None else "json"
+
+if msgspec is not None:
+    _msgspec_decoder = msgspec.json.Decoder()
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    Decode a single JSON line.
+
+    Anything the fast backend rejects is passed to ``json.loads``,
+    which raises the usual ``ValueError`` for invalid input.
+    """
+    if DECODER == "orjson":
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+
+    elif DECODER == "msgspec":
+        try:
+            return _msgspec_decoder.decode(data)
+        except msgspec.DecodeError:
+            pass
+
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> str:
+    """
+    Encode ``obj`` as a single compact JSON line without escaping non-ascii characters
+    """
+    if ENCODER == "orjson":
+        try:
+            return orjson.dumps(obj).decode("utf-8")
+        except (orjson.JSONEncodeError, UnicodeDecodeError):
+            # e.g. lone surrogates or integers beyond 64 bits
+            pass
+
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
@@ -0,0 +1,282 @@
+from typing import Optional, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from .page import TeletextPage
+
+
+class PageGrid:
+    """
+    Character cell representation of a ``TeletextPage`` as numpy arrays.
+
+    Each array has the shape (height, width), or (N, height, width)
+    for stacked grids (see ``stack``):
+
+        - ``codepoints``: uint32 unicode codepoint, 0 for padding
+        - ``color``, ``bg_color``: uint8 index into ``COLORS``, 0 for no color
+        - ``char_set``: uint8
+        - ``link``: int16 with an additional last axis of (page, sub_page),
+          -1 for no link or no sub-page
+        - ``block_start``: bool, True where a new ``Block`` starts
+
+    ``line_lengths`` holds the number of characters of each line.
+    Together with ``block_start`` it makes the conversion back
+    to ``TeletextPage.lines`` lossless. Empty blocks occupy no cells
+    and are kept in ``empty_blocks`` as (row, column, Block) tuples.
+
+    The default size is 25x40, larger pages increase the grid size.
+    """
+
+    COLORS = (None, "b", "r", "g", "y", "l", "m", "c", "w")
+    COLOR_INDEX = {c: i for i, c in enumerate(COLORS)}
+
+    def __init__(
+            self,
+            codepoints: np.ndarray,
+            color: np.ndarray,
+            bg_color: np.ndarray,
+            char_set: np.ndarray,
+            link: np.ndarray,
+            block_start: np.ndarray,
+            line_lengths: np.ndarray,
+            empty_blocks: Optional[List[Tuple[int, int, TeletextPage.Block]]] = None,
+    ):
+        self.codepoints = codepoints
+        self.color = color
+        self.bg_color = bg_color
+        self.char_set = char_set
+        self.link = link
+        self.block_start = block_start
+        self.line_lengths = line_lengths
+        self.empty_blocks = empty_blocks or []
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({'x'.join(str(s) for s in self.shape)})"
+
+    def __eq__(self, other) -> bool:
+        """
+        Same as ``TeletextPage.__eq__``, which includes the block structure
+        """
+        if not isinstance(other, PageGrid):
+            return False
+        if self.shape != other.shape:
+            return False
+        return bool(
+            (self.line_lengths == other.line_lengths).all()
+            and (self.block_start == other.block_start).all()
+            and not self.changed_mask(other).any()
+            and self.empty_blocks == other.empty_blocks
+        )
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.codepoints.shape
+
+    @property
+    def height(self) -> int:
+        return self.codepoints.shape[-2]
+
+    @property
+    def width(self) -> int:
+        return self.codepoints.shape[-1]
+
+    @classmethod
+    def empty(cls, height: int = 25, width: int = 40, num_lines: int = 0) -> "PageGrid":
+        link = np.full((height, width, 2), -1, dtype=np.int16)
+        return cls(
+            codepoints=np.zeros((height, width), dtype=np.uint32),
+            color=np.zeros((height, width), dtype=np.uint8),
+            bg_color=np.zeros((height, width), dtype=np.uint8),
+            char_set=np.zeros((height, width), dtype=np.uint8),
+            link=link,
+            block_start=np.zeros((height, width), dtype=bool),
+            line_lengths=np.zeros(num_lines, dtype=np.int16),
+        )
+
+    @classmethod
+    def from_page(cls, page: TeletextPage, height: int = 25, width: int = 40) -> "PageGrid":
+        """
+        Create the grid of a page.
+
+        :param page: TeletextPage
+        :param height: int, minimum number of rows
+        :param width: int, minimum number of columns
+        """
+        line_lengths = [sum(len(b.text) for b in line) for line in page.lines]
+        grid = cls.empty(
+            height=max(height, len(line_lengths)),
+            width=max(width, 0, *line_lengths),
+            num_lines=len(line_lengths),
+        )
+        grid.line_lengths[:] = line_lengths
+
+        for y, line in enumerate(page.lines):
+            x = 0
+            for block in line:
+                if not block.text:
+                    grid.empty_blocks.append((y, x, block))
+                    continue
+                x2 = x + len(block.text)
+                grid.codepoints[y, x:x2] = np.frombuffer(
+                    block.text.encode("utf-32-le", "surrogatepass"), dtype=np.uint32
+                )
+                grid.color[y, x:x2] = cls.COLOR_INDEX[block.color]
+                grid.bg_color[y, x:x2] = cls.COLOR_INDEX[block.bg_color]
+                grid.char_set[y, x:x2] = block.char_set
+                if block.link is not None:
+                    if isinstance(block.link, list):
+                        grid.link[y, x:x2] = block.link
+                    else:
+                        grid.link[y, x:x2, 0] = block.link
+                grid.block_start[y, x] = True
+                x = x2
+
+        return grid
+
+    def to_lines(self) -> List[List[TeletextPage.Block]]:
+        """
+        Convert back to the ``TeletextPage.lines`` representation
+        """
+        if len(self.shape) != 2:
+            raise ValueError(f"Can not convert stacked grid {self} to lines")
+
+        empty_blocks = {}
+        for y, x, block in self.empty_blocks:
+            empty_blocks.setdefault((y, x), []).append(block)
+
+        lines = []
+        for y, length in enumerate(self.line_lengths.tolist()):
+            line = []
+            starts = np.flatnonzero(self.block_start[y, :length]).tolist()
+            for x, x2 in zip(starts, starts[1:] + [length]):
+                line.extend(empty_blocks.get((y, x), []))
+                link = self.link[y, x].tolist()
+                if link[0] < 0:
+                    link = None
+                elif link[1] < 0:
+                    link = link[0]
+                line.append(TeletextPage.Block(
+                    text=self.codepoints[y, x:x2].tobytes().decode("utf-32-le", "surrogatepass"),
+                    color=self.COLORS[self.color[y, x]],
+                    bg_color=self.COLORS[self.bg_color[y, x]],
+                    char_set=int(self.char_set[y, x]),
+                    link=link,
+                ))
+            line.extend(empty_blocks.get((y, length), []))
+            lines.append(line)
+
+        return lines
+
+    def to_page(self) -> TeletextPage:
+        """
+        Create a new page with the lines of this grid, the header fields are left at default
+        """
+        page = TeletextPage()
+        page.lines = self.to_lines()
+        return page
+
+    def resize(self, height: int, width: int) -> "PageGrid":
+        """
+        Return a copy padded to the given size, which must not be smaller than the current
+        """
+        if height < self.height or width < self.width:
+            raise ValueError(f"Can not shrink {self} to {height}x{width}")
+
+        def _pad(array: np.ndarray, value=0, axes: int = 2):
+            pad = [(0, 0)] * array.ndim
+            pad[array.ndim - axes] = (0, height - self.height)
+            pad[array.ndim - axes + 1] = (0, width - self.width)
+            return np.pad(array, pad, constant_values=value)
+
+        return self.__class__(
+            codepoints=_pad(self.codepoints),
+            color=_pad(self.color),
+            bg_color=_pad(self.bg_color),
+            char_set=_pad(self.char_set),
+            link=_pad(self.link, -1, axes=3),
+            block_start=_pad(self.block_start),
+            line_lengths=self.line_lengths.copy(),
+            empty_blocks=list(self.empty_blocks),
+        )
+
+    @classmethod
+    def stack(cls, grids: Sequence["PageGrid"]) -> "PageGrid":
+        """
+        Stack several (e.g. consecutive versions of a page) into one grid
+        with an additional first axis. Smaller grids are padded.
+
+        ``line_lengths`` becomes a (N, max-number-of-lines) array padded with -1.
+        Stacked grids can not be converted to lines and ``empty_blocks`` is dropped.
+        """
+        height = max(g.height for g in grids)
+        width = max(g.width for g in grids)
+        grids = [
+            g if g.shape == (height, width) else g.resize(height, width)
+            for g in grids
+        ]
+        line_lengths = np.full((len(grids), max(len(g.line_lengths) for g in grids)), -1, dtype=np.int16)
+        for i, g in enumerate(grids):
+            line_lengths[i, :len(g.line_lengths)] = g.line_lengths
+
+        return cls(
+            codepoints=np.stack([g.codepoints for g in grids]),
+            color=np.stack([g.color for g in grids]),
+            bg_color=np.stack([g.bg_color for g in grids]),
+            char_set=np.stack([g.char_set for g in grids]),
+            link=np.stack([g.link for g in grids]),
+            block_start=np.stack([g.block_start for g in grids]),
+            line_lengths=line_lengths,
+        )
+
+    def region_mask(
+            self,
+            rows: Union[None, slice, Sequence[int]] = None,
+            columns: Union[None, slice, Sequence[int]] = None,
+    ) -> np.ndarray:
+        """
+        Return a (height, width) bool mask that is True inside the region.
+
+        E.g. ``grid.region_mask(rows=slice(1, None))`` to ignore the first line
+        """
+        mask = np.zeros((self.height, self.width), dtype=bool)
+        rows = slice(None) if rows is None else rows
+        columns = slice(None) if columns is None else columns
+        mask[np.ix_(np.arange(self.height)[rows], np.arange(self.width)[columns])] = True
+        return mask
+
+    def changed_mask(self, other: "PageGrid", mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Return a bool array that is True for each cell whose character or attributes differ.
+
+        Stacked and single grids broadcast against each other,
+        the grids must have the same height and width.
+
+        :param other: PageGrid
+        :param mask: optional bool array, cells outside the mask are never reported as changed
+        """
+        if self.shape[-2:] != other.shape[-2:]:
+            raise ValueError(f"Can not compare grids of different size {self} and {other}")
+
+        changed = (self.codepoints != other.codepoints) \
+            | (self.color != other.color) \
+            | (self.bg_color != other.bg_color) \
+            | (self.char_set != other.char_set) \
+            | (self.link != other.link).any(axis=-1)
+
+        if mask is not None:
+            changed &= mask
+        return changed
+
+    def changed_lines(self, other: "PageGrid", mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Return a bool array that is True for each row with changed cells
+        """
+        return self.changed_mask(other, mask=mask).any(axis=-1)
+
+    def equals(self, other: "PageGrid", mask: Optional[np.ndarray] = None) -> bool:
+        """
+        Compare the visible content of both grids, optionally inside ``mask`` only.
+
+        Unlike ``__eq__`` the splitting into blocks is ignored.
+        """
+        return not self.changed_mask(other, mask=mask).any()
@@ -0,0 +1,70 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from .page import TeletextPage
+
+
+class LineInternTable:
+    """
+    LRU table of parsed page lines, keyed by the raw ndjson line.
+
+    Passed to ``Teletext.from_ndjson``, identical lines of all loaded
+    snapshots share the same line object, which is a tuple of ``Block`` instances.
+    Shared lines (and their blocks) must not be modified.
+
+    The table can be shared between threads.
+    """
+
+    def __init__(self, max_lines: int = 100_000):
+        """
+        :param max_lines: int, maximum number of distinct lines to keep
+        """
+        self.max_lines = max_lines
+        self.hits = 0
+        self.misses = 0
+        self._lines: Dict[str, Tuple[TeletextPage.Block, ...]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}({len(self)}/{self.max_lines} lines"
+            f", hits={self.hits}, misses={self.misses})"
+        )
+
+    def __len__(self):
+        return len(self._lines)
+
+    def get(self, key: str) -> Optional[Tuple[TeletextPage.Block, ...]]:
+        with self._lock:
+            line = self._lines.get(key)
+            if line is None:
+                self.misses += 1
+            else:
+                self._lines.move_to_end(key)
+                self.hits += 1
+            return line
+
+    def put(
+            self,
+            key: str,
+            line: Tuple[TeletextPage.Block, ...],
+    ) -> Tuple[TeletextPage.Block, ...]:
+        """
+        Store the line and return the line that is stored for ``key``
+        """
+        with self._lock:
+            line = self._lines.setdefault(key, line)
+            while len(self._lines) > self.max_lines:
+                self._lines.popitem(last=False)
+            return line
+
+    def parse(self, key: str, data: list) -> Tuple[TeletextPage.Block, ...]:
+        """
+        Create the line from the decoded json ``data`` and store it
+        """
+        return self.put(key, tuple(TeletextPage.Block.from_json(block) for block in data))
+
+    def clear(self):
+        with self._lock:
+            self._lines.clear()
@@ -1,9 +1,10 @@
 import io
-import json
+import hashlib
 from typing import List, Optional, TextIO, Tuple, Union
 
 from ..console import ConsoleColors as CC
 from ..words import tokenize, concat_split_words
+from . import codec
 from .unico import (
     G0_TO_UNICODE_MAPPING, G1_TO_UNICODE_MAPPING, G3_TO_UNICODE_MAPPING,
     RE_ANSI_ESCAPE
@@ -53,6 +54,8 @@ class TeletextPage:
          - the extended character set
          - a teletext page link
         """
+        __slots__ = ("text", "color", "bg_color", "char_set", "_link")
+
         def __init__(
                 self,
                 text: str,
@@ -64,6 +67,7 @@ class TeletextPage:
             assert color is None or color in TeletextPage.COLOR_CONSOLE_MAPPING, color
             assert bg_color is None or bg_color in TeletextPage.COLOR_CONSOLE_MAPPING, bg_color
             self.text = text
+            # color codes are single characters, which CPython already shares
             self.color = color
             self.bg_color = bg_color
             self.char_set = char_set
@@ -145,6 +149,11 @@ class TeletextPage:
 
             return cls(**kwargs)
 
+    __slots__ = (
+        "lines", "index", "sub_index", "timestamp", "error", "category",
+        "_line_hashes", "_digest",
+    )
+
     def __init__(self):
         self.lines = []
         self.index = 100
@@ -152,6 +161,8 @@ class TeletextPage:
         self.timestamp: str = None
         self.error: str = None
         self.category: str = None
+        self._line_hashes: Optional[Tuple[int, ...]] = None
+        self._digest: Optional[str] = None
 
     def __str__(self):
         return f"{self.index}/{self.sub_index}({len(self.lines)} lines)"
@@ -162,14 +173,65 @@ class TeletextPage:
         """
         if not isinstance(other, TeletextPage):
             return False
-        return self.lines == other.lines
+        return self.digest == other.digest
+
+    @property
+    def line_hashes(self) -> Tuple[int, ...]:
+        """
+        A 64 bit hash of each line, calculated from the ndjson encoding of the line.
+
+        The hashes are cached. ``new_line`` and ``add_block`` reset the cache,
+        if ``lines`` or the blocks are changed otherwise,
+        ``invalidate_digest`` must be called.
+        """
+        if self._line_hashes is None:
+            self._line_hashes = tuple(
+                int.from_bytes(
+                    hashlib.blake2b(
+                        codec.dumps([b.to_json() for b in line]).encode("utf-8", "surrogatepass"),
+                        digest_size=8,
+                    ).digest(),
+                    "little",
+                )
+                for line in self.lines
+            )
+        return self._line_hashes
+
+    @property
+    def digest(self) -> str:
+        """
+        Hex digest of the page content (not of the header fields), see ``line_hashes``
+        """
+        if self._digest is None:
+            hasher = hashlib.blake2b(digest_size=16)
+            for h in self.line_hashes:
+                hasher.update(h.to_bytes(8, "little"))
+            self._digest = hasher.hexdigest()
+        return self._digest
+
+    def invalidate_digest(self):
+        self._line_hashes = None
+        self._digest = None
+
+    def changed_lines(self, other: "TeletextPage") -> List[int]:
+        """
+        Returns the indices of all lines that differ from the other page,
+        including the lines that only exist in one of the pages.
+        """
+        hashes, other_hashes = self.line_hashes, other.line_hashes
+        return [
+            i for i in range(max(len(hashes), len(other_hashes)))
+            if i >= len(hashes) or i >= len(other_hashes) or hashes[i] != other_hashes[i]
+        ]
 
     def new_line(self):
+        self.invalidate_digest()
         self.lines.append([])
         if len(self.lines) > 1:
             self.lines[-2] = self._simplify_line(self.lines[-2])
 
     def add_block(self, block: Block):
+        self.invalidate_digest()
         if "\n" not in block.text:
             self.lines[-1].append(block)
         else:
@@ -193,11 +255,11 @@ class TeletextPage:
         }
         if self.error:
             header["error"] = self.error
-        print(json.dumps(header, ensure_ascii=False, separators=(',', ':')), file=file)
+        print(codec.dumps(header), file=file)
         if not self.error:
             for line in self.lines:
                 json_line = [b.to_json() for b in line]
-                print(json.dumps(json_line, ensure_ascii=False, separators=(',', ':')), file=file)
+                print(codec.dumps(json_line), file=file)
 
     def to_ansi(self, file: Optional[TextIO] = None, colors: bool = True, border: bool = False) -> Optional[str]:
         if file is None:
@@ -259,6 +321,14 @@ class TeletextPage:
         renderer = TeletextImageRenderer()
         return renderer.render(self)
 
+    def to_grid(self, height: int = 25, width: int = 40):
+        """
+        Returns a ``PageGrid`` with numpy arrays of the characters and attributes,
+        numpy is only imported when this is called
+        """
+        from .grid import PageGrid
+        return PageGrid.from_page(self, height=height, width=width)
+
     def to_text(self, concat_split_words: bool = True) -> str:
         """
         Returns everything that is not graphics or numbers.
@@ -1,18 +1,27 @@
-import json
+import sys
+import bisect
+import hashlib
 from pathlib import Path
-from typing import List, Optional, TextIO, Tuple, Union, IO, Dict
+from typing import List, Optional, Tuple, Union, IO, Dict, Generator, Iterable
 
 from .page import TeletextPage
+from .intern import LineInternTable
+from . import codec
 
 
 class Teletext:
     
     def __init__(self):
         self.pages: Dict[Tuple[int, int], TeletextPage] = {}
+        # sorted list of all (page, sub_page) indices
         self.page_index: List[Tuple[int, int]] = []
+        # sorted sub-page numbers of each page number
+        self.sub_pages: Dict[int, List[int]] = {}
         self.timestamp: str = None
         self.channel: str = None
         self.commit_hash: str = None
+        # raw byte range hash to page, set when loaded with ``previous``
+        self.page_hashes: Dict[bytes, TeletextPage] = {}
 
     def __repr__(self):
         return f"{self.__class__.__name__}({self.timestamp}, {self.channel}, {len(self.pages)})"
@@ -22,30 +31,109 @@ class Teletext:
             cls,
             file: Union[str, Path, IO, List[str], bytes],
             ignore_errors: bool = True,
+            lazy: bool = False,
+            intern_table: Optional[LineInternTable] = None,
+            previous: Optional["Teletext"] = None,
     ) -> "Teletext":
-        from ..scraper import scraper_classes
-        from .. import sources
-        
+        """
+        Load a snapshot file.
+
+        :param file: filename, file object, list of lines or the file content
+        :param ignore_errors: bool, skip content lines that can not be parsed
+        :param lazy: bool, only parse the headers and keep the file content.
+            The lines of a page are parsed when it is accessed through ``pages``
+            or ``get_page``, see ``LazyPages``.
+        :param intern_table: optional LineInternTable, share identical page lines
+            with other snapshots loaded with the same table.
+            The lines of the pages are tuples in this case and must not be modified.
+        :param previous: optional Teletext, the previous version of this snapshot, loaded
+            with ``previous`` as well (use an empty ``Teletext()`` for the first one).
+            Each page whose header and content lines are byte-identical to a page
+            in ``previous`` is not decoded, instead the previous page object is used.
+            Not supported with ``lazy`` or a list of lines.
+        """
+        if lazy and not isinstance(file, list):
+            return cls._from_ndjson_lazy(file, ignore_errors=ignore_errors, intern_table=intern_table)
+
+        if previous is not None and not isinstance(file, list):
+            return cls._from_ndjson_incremental(
+                file, previous, ignore_errors=ignore_errors, intern_table=intern_table,
+            )
+
         if isinstance(file, (str, Path)):
             lines = Path(file).read_text().strip().splitlines()
         elif isinstance(file, list):
             lines = file
         elif isinstance(file, bytes):
-            lines = file.replace(b"\x96\xc2\x00\x0a", b"").decode().splitlines()
+            lines = _iter_bytes_lines(file)
         else:
             content = file.read()
             if isinstance(content, bytes):
                 content = content.decode()
             lines = content.splitlines()
 
+        tt = cls()
+        tt._parse_lines(lines, dict(), ignore_errors=ignore_errors, intern_table=intern_table)
+        return tt
+
+    @classmethod
+    def _from_ndjson_incremental(
+            cls,
+            file: Union[str, Path, IO, bytes],
+            previous: "Teletext",
+            ignore_errors: bool = True,
+            intern_table: Optional[LineInternTable] = None,
+    ) -> "Teletext":
+        data = cls._read_bytes(file)
+        view = memoryview(data)
+
         tt = cls()
         scrapers = dict()
 
+        # split at the header lines, the file header is followed by the pages
+        pos = 0
+        while pos < len(data):
+            next_pos = data.find(b"\n{", pos)
+            next_pos = len(data) if next_pos < 0 else next_pos + 1
+
+            digest = hashlib.blake2b(view[pos:next_pos], digest_size=16).digest()
+            page = previous.page_hashes.get(digest)
+            if page is not None:
+                tt.add_page(page)
+                tt.page_hashes[digest] = page
+            else:
+                page = tt._parse_lines(
+                    _iter_bytes_lines(data[pos:next_pos]), scrapers,
+                    ignore_errors=ignore_errors, intern_table=intern_table,
+                )
+                if page is not None:
+                    tt.page_hashes[digest] = page
+
+            pos = next_pos
+
+        return tt
+
+    def _parse_lines(
+            self,
+            lines: Iterable[str],
+            scrapers: dict,
+            ignore_errors: bool = True,
+            intern_table: Optional[LineInternTable] = None,
+    ) -> Optional[TeletextPage]:
+        """
+        Parse file header, page header and content lines, returns the last page
+        """
         cur_page = None
         for line_idx, line in enumerate(lines):
+            key = line
+            if intern_table is not None and cur_page is not None and line.startswith("["):
+                shared_line = intern_table.get(key)
+                if shared_line is not None:
+                    cur_page.lines.append(shared_line)
+                    continue
 
             try:
-                line = json.loads(line)
+                line = codec.loads(line)
             except:
                 print(f"ERROR in line #{line_idx} '{line}'")
                 if ignore_errors and not line.startswith("{"):
@@ -53,62 +141,381 @@ class Teletext:
                 raise
 
             if isinstance(line, dict):
-                # file header
-                if "scraper" in line:
-                    tt.timestamp = line["timestamp"]
-                    tt.channel = line["scraper"]
-                    if tt.channel not in scrapers:
-                        scrapers[tt.channel] = scraper_classes[tt.channel]()
-                    continue
+                cur_page = self._add_header(line, scrapers)
+
+            # page content
+            else:
+                assert cur_page, f"line before page"
+                if intern_table is not None:
+                    cur_page.lines.append(intern_table.parse(key, line))
+                else:
+                    cur_page.lines.append([
+                        TeletextPage.Block.from_json(block)
+                        for block in line
+                    ])
+
+        return cur_page
+
+    @classmethod
+    def _from_ndjson_lazy(
+            cls,
+            file: Union[str, Path, IO, bytes],
+            ignore_errors: bool = True,
+            intern_table: Optional[LineInternTable] = None,
+    ) -> "Teletext":
+        data = cls._read_bytes(file)
+
+        tt = cls()
+        tt.pages = LazyPages(data, ignore_errors=ignore_errors, intern_table=intern_table)
+        scrapers = dict()
+
+        # header lines start with `{`, page content lines with `[`
+        cur_index = None
+        pos = 0 if data.startswith(b"{") else data.find(b"\n{")
+        while pos >= 0:
+            if data[pos] == ord("\n"):
+                pos += 1
+            end = data.find(b"\n", pos)
+            if end < 0:
+                end = len(data)
+
+            next_pos = data.find(b"\n{", end)
+            page = tt._add_header(codec.loads(data[pos:end]), scrapers)
+            if page is not None:
+                cur_index = (page.index, page.sub_index)
+                tt.pages.set_range(cur_index, end + 1, next_pos if next_pos >= 0 else len(data))
+
+            pos = next_pos
+
+        return tt
+
+    @classmethod
+    def scan_headers(
+            cls,
+            file: Union[str, Path, IO, bytes],
+            pages: bool = True,
+    ) -> Tuple[dict, List[Tuple[int, int, str, Optional[str]]]]:
+        """
+        Read only the file header and the page headers of a snapshot.
+
+        Page header lines are found by their ``{"page"`` prefix,
+        content lines are not decoded at all.
+
+        :param file: filename, file object or the file content
+        :param pages: bool, if False, only the file header is read and the list is empty
+        :return: tuple of the file header dict (``scraper`` and ``timestamp``)
+            and a list of ``(page, sub_page, timestamp, error)`` tuples in file order
+        """
+        data = cls._read_bytes(file)
+
+        end = data.find(b"\n")
+        first_line = data[:end if end >= 0 else len(data)]
+        header = codec.loads(first_line) if first_line.startswith(b"{") else {}
+        if "scraper" not in header:
+            header = {}
+
+        if not pages:
+            return header, []
+
+        pages = []
+        pos = data.find(b'{"page"') if not header else data.find(b'\n{"page"')
+        while pos >= 0:
+            end = data.find(b"\n", pos + 1)
+            if end < 0:
+                end = len(data)
+            line = codec.loads(data[pos:end])
+            pages.append((
+                line["page"],
+                line["sub_page"],
+                sys.intern(line["timestamp"]),
+                line.get("error"),
+            ))
+            pos = data.find(b'\n{"page"', end)
+
+        return header, pages
+
+    @classmethod
+    def _read_bytes(cls, file: Union[str, Path, IO, bytes]) -> bytes:
+        if isinstance(file, (str, Path)):
+            data = Path(file).read_bytes()
+        elif isinstance(file, bytes):
+            data = file
+        else:
+            data = file.read()
+            if isinstance(data, str):
+                data = data.encode()
+        return data.replace(b"\x96\xc2\x00\x0a", b"")
+
+    @classmethod
+    def iter_pages_ndjson(
+            cls,
+            fileobj: IO[bytes],
+            header: Optional[dict] = None,
+            ignore_errors: bool = True,
+    ) -> Generator[TeletextPage, None, None]:
+        """
+        Yields the pages of a snapshot one after another while reading
+        the binary stream, so only the current page is kept in memory.
 
-                # page header
-                cur_page = TeletextPage()
-                cur_page.index = line["page"]
-                cur_page.sub_index = line["sub_page"]
-                cur_page.timestamp = line["timestamp"]
-                cur_page.error = line.get("error")
-                cur_page.category = scrapers[tt.channel].get_page_category(cur_page.index, cur_page.timestamp)
+        :param fileobj: binary file object
+        :param header: optional dict, it is updated with the file header
+            (``scraper`` and ``timestamp``) as soon as it is read
+        :param ignore_errors: bool, skip content lines that can not be parsed
+        """
+        tt = cls()
+        scrapers = dict()
 
-                index = (cur_page.index, cur_page.sub_index)
-                tt.pages[index] = cur_page
-                tt.page_index.append(index)
+        cur_page = None
+        for line_idx, line in enumerate(_iter_ndjson_lines(fileobj)):
+            try:
+                line = codec.loads(line)
+            except ValueError:
+                print(f"ERROR in line #{line_idx} '{line}'")
+                if ignore_errors and not line.startswith(b"{"):
+                    continue
+                raise
+
+            if isinstance(line, dict):
+                if cur_page is not None:
+                    yield cur_page
+                cur_page = tt._parse_header(line, scrapers)
+                if cur_page is None and header is not None:
+                    header.update(line)
 
             # page content
             else:
-                assert cur_page, f"line before page"
+                assert cur_page, "line before page"
                 cur_page.lines.append([
                     TeletextPage.Block.from_json(block)
                     for block in line
                 ])
-        
-        tt.page_index.sort()
-        return tt
+
+        if cur_page is not None:
+            yield cur_page
+
+    def _add_header(self, line: dict, scrapers: dict) -> Optional[TeletextPage]:
+        """
+        Handle a file or page header line, returns the new page for page headers
+        """
+        page = self._parse_header(line, scrapers)
+        if page is not None:
+            self.add_page(page)
+        return page
+
+    def _parse_header(self, line: dict, scrapers: dict) -> Optional[TeletextPage]:
+        """
+        Handle a file header or create the page of a page header
+        """
+        from ..scraper import scraper_classes
+        from .. import sources
+
+        # file header
+        if "scraper" in line:
+            self.timestamp = line["timestamp"]
+            self.channel = line["scraper"]
+            if self.channel not in scrapers:
+                scrapers[self.channel] = scraper_classes[self.channel]()
+            return None
+
+        # page header
+        page = TeletextPage()
+        page.index = line["page"]
+        page.sub_index = line["sub_page"]
+        # pages scraped in the same second share the string
+        page.timestamp = sys.intern(line["timestamp"])
+        page.error = line.get("error")
+        page.category = scrapers[self.channel].get_page_category(page.index, page.timestamp)
+        if page.category is not None:
+            page.category = sys.intern(page.category)
+        return page
+
+    def add_page(self, page: TeletextPage):
+        """
+        Add the page or replace the page with the same index and keep the indices sorted
+        """
+        index = (page.index, page.sub_index)
+        if index not in self.pages:
+            bisect.insort(self.page_index, index)
+            bisect.insort(self.sub_pages.setdefault(page.index, []), page.sub_index)
+        self.pages[index] = page
+
+    def get_sub_pages(self, page: int) -> List[int]:
+        return self.sub_pages.get(page, [])
 
     def get_page(self, page: int, sub_page: Optional[int] = None) -> Optional[TeletextPage]:
-        if sub_page is not None:
-            return self.pages.get((page, sub_page))
-        for key in self.page_index:
-            if key[0] == page:
-                return self.pages[key]
+        """
+        Return the page or None, without ``sub_page`` the first existing sub-page is returned
+        """
+        if sub_page is None:
+            sub_pages = self.sub_pages.get(page)
+            if not sub_pages:
+                return None
+            sub_page = sub_pages[0]
+        return self.pages.get((page, sub_page))
 
     def get_next_page(self, page: int, sub_page: int, dir: int = 1) -> Tuple[int, int]:
+        """
+        Return the existing index at or after (``dir`` == 0), after (``dir`` > 0)
+        or before (``dir`` < 0) the given index, wrapping around at the ends.
+        """
         page = page, sub_page
         if dir == 0:
-            for p in self.page_index:
-                if p >= page:
-                    return p
-            return self.page_index[0]
+            i = bisect.bisect_left(self.page_index, page)
+            return self.page_index[i] if i < len(self.page_index) else self.page_index[0]
 
         if dir > 0:
-            for p in self.page_index:
-                if p > page:
-                    return p
-            return self.page_index[0]
+            i = bisect.bisect_right(self.page_index, page)
+            return self.page_index[i] if i < len(self.page_index) else self.page_index[0]
 
         elif dir < 0:
-            for p in reversed(self.page_index):
-                if p < page:
-                    return p
-            return self.page_index[-1]
+            i = bisect.bisect_left(self.page_index, page)
+            return self.page_index[i - 1] if i > 0 else self.page_index[-1]
+
+        return page
+
+
+class LazyPages(dict):
+    """
+    ``Teletext.pages`` of a snapshot loaded with ``Teletext.from_ndjson(lazy=True)``.
+
+    It contains all pages with their header values but the lines
+    of a page are only parsed when it is accessed through ``[]``, ``get``,
+    ``values``, ``items`` or ``pop``.
+
+    ``values`` and ``items`` return lists instead of views.
+    """
+
+    def __init__(self, data: bytes, ignore_errors: bool = True, intern_table: Optional[LineInternTable] = None):
+        super().__init__()
+        self._data = data
+        self._ignore_errors = ignore_errors
+        self._intern_table = intern_table
+        self._ranges: Dict[Tuple[int, int], Tuple[int, int]] = {}
 
+    def set_range(self, index: Tuple[int, int], start: int, end: int):
+        """
+        Set the byte range of the content lines of a page
+        """
+        self._ranges[index] = (start, end)
+
+    @property
+    def num_unparsed(self) -> int:
+        return len(self._ranges)
+
+    def __getitem__(self, index: Tuple[int, int]) -> TeletextPage:
+        page = super().__getitem__(index)
+        if index in self._ranges:
+            self._parse(index, page)
         return page
+
+    def __setitem__(self, index: Tuple[int, int], page: TeletextPage):
+        self._ranges.pop(index, None)
+        super().__setitem__(index, page)
+
+    def __delitem__(self, index: Tuple[int, int]):
+        self._ranges.pop(index, None)
+        super().__delitem__(index)
+
+    def get(self, index: Tuple[int, int], default=None) -> Optional[TeletextPage]:
+        if index in self:
+            return self[index]
+        return default
+
+    def values(self) -> List[TeletextPage]:
+        return [self[index] for index in self]
+
+    def items(self) -> List[Tuple[Tuple[int, int], TeletextPage]]:
+        return [(index, self[index]) for index in self]
+
+    def pop(self, index: Tuple[int, int], *default) -> Optional[TeletextPage]:
+        if index in self:
+            self[index]
+        return super().pop(index, *default)
+
+    def _parse(self, index: Tuple[int, int], page: TeletextPage):
+        start, end = self._ranges.pop(index)
+        for line in self._data[start:end].split(b"\n"):
+            if not line:
+                continue
+            key = line
+            if self._intern_table is not None:
+                # same keys as the decoded lines of the non-lazy loading
+                key = line.decode()
+                shared_line = self._intern_table.get(key)
+                if shared_line is not None:
+                    page.lines.append(shared_line)
+                    continue
+
+            try:
+                line = codec.loads(line)
+            except ValueError:
+                print(f"ERROR in page {index} '{line}'")
+                if self._ignore_errors:
+                    continue
+                raise
+
+            if self._intern_table is not None:
+                page.lines.append(self._intern_table.parse(key, line))
+            else:
+                page.lines.append([
+                    TeletextPage.Block.from_json(block)
+                    for block in line
+                ])
+
+        if not self._ranges:
+            # everything is parsed
+            self._data = b""
+
+
+def _iter_ndjson_lines(fileobj: IO[bytes]) -> Generator[bytes, None, None]:
+    """
+    Yields the non-empty lines of a binary stream,
+    without the garbage sequence that is found in some old snapshots
+    """
+    pending = b""
+    for line in fileobj:
+        if line.endswith(b"\x96\xc2\x00\n"):
+            pending += line[:-4]
+            continue
+        if pending:
+            line = pending + line
+            pending = b""
+        line = line.rstrip(b"\r\n")
+        if line:
+            yield line
+
+    if pending:
+        yield pending
+
+
+def _iter_bytes_lines(data: bytes) -> Generator[str, None, None]:
+    """
+    Yields the decoded non-empty lines of ``data`` like ``_iter_ndjson_lines``.
+
+    Lines are sliced and decoded one at a time, so there is never
+    a second copy of the whole content.
+    """
+    pos = 0
+    pending = b""
+    size = len(data)
+    while pos < size:
+        end = data.find(b"\n", pos)
+        if end < 0:
+            end = size
+
+        line = data[pos:end]
+        pos = end + 1
+
+        if end < size and line.endswith(b"\x96\xc2\x00"):
+            pending += line[:-3]
+            continue
+        if pending:
+            line = pending + line
+            pending = b""
+        if line.endswith(b"\r"):
+            line = line[:-1]
+        if line:
+            yield line.decode()
+
+    if pending:
+        yield pending.decode()
@@ -0,0 +1,519 @@
+import os
+import random
+import datetime
+import asyncio
+import tempfile
+import unittest
+import subprocess
+from pathlib import Path
+from typing import List, Dict, Optional
+
+from src.giterator import Giterator, AsyncGiterator, BlobCache
+from src.giterator.objects import ObjectStore
+
+
+class FakeCommit:
+
+    def __init__(self, hash: str, parent_hash: List[str]):
+        self.hash = hash
+        self.parent_hash = parent_hash
+
+
+class FakeGiterator(Giterator):
+
+    def __init__(self, commits: List[FakeCommit]):
+        super().__init__(".")
+        self.commits = commits
+
+    def iter_commits(self, offset: int = 0, count: int = 0, **kwargs):
+        yield from self.commits[offset:offset + count if count else None]
+
+
+def iter_commits_consecutive_quadratic(commits, branch_length: int, branch_age: int):
+    """
+    The previous implementation of Giterator.iter_commits_consecutive
+    """
+    branches = []
+    for commit in commits:
+        if not commit.parent_hash:
+            branches.append([0, commit])
+
+        else:
+            added = False
+            new_branches = []
+            for branch in branches:
+                for parent_hash in commit.parent_hash:
+                    if not added and parent_hash == branch[-1].hash:
+                        branch.append(commit)
+                        added = True
+                        break
+
+                branch[0] += 1
+                if len(branch) - 1 > branch_length or branch[0] > branch_age:
+                    yield from branch[1:]
+                else:
+                    new_branches.append(branch)
+
+            branches = new_branches
+
+            if not added:
+                branches.append([0, commit])
+
+    for branch in branches:
+        yield from branch[1:]
+
+
+def create_history(seed: int, num_commits: int) -> List[FakeCommit]:
+    """
+    Random, merge-heavy history, oldest commit first
+    """
+    rnd = random.Random(seed)
+    commits = []
+    for i in range(num_commits):
+        if not commits or rnd.random() < .02:
+            parents = []
+        else:
+            recent = commits[-20:]
+            parents = [rnd.choice(recent).hash for _ in range(rnd.choice([1, 1, 1, 2, 2, 3]))]
+            parents = list(dict.fromkeys(parents))
+        commits.append(FakeCommit(f"{i:040x}", parents))
+    return commits
+
+
+class TempRepo:
+    """
+    A small git repository in a temporary directory
+    """
+
+    def __init__(self):
+        self._tempdir = tempfile.TemporaryDirectory()
+        self.path = Path(self._tempdir.name)
+        self.num_commits = 0
+        self.git("init", "-q", "-b", "main")
+
+    def close(self):
+        self._tempdir.cleanup()
+
+    def git(self, *args: str) -> str:
+        date = f"2023-01-01T00:00:{self.num_commits:02}+00:00"
+        env = {
+            **os.environ,
+            "GIT_AUTHOR_NAME": "Author", "GIT_AUTHOR_EMAIL": "author@example.com",
+            "GIT_COMMITTER_NAME": "Committer", "GIT_COMMITTER_EMAIL": "committer@example.com",
+            "GIT_AUTHOR_DATE": date, "GIT_COMMITTER_DATE": date,
+            "GIT_CONFIG_GLOBAL": os.devnull, "GIT_CONFIG_NOSYSTEM": "1",
+        }
+        return subprocess.check_output(["git", *args], cwd=self.path, env=env).decode("utf-8")
+
+    def commit(self, files: Dict[str, Optional[str]], message: Optional[str] = None) -> str:
+        """
+        Write (or delete, if None) the files and commit them, returns the commit hash
+        """
+        for name, content in files.items():
+            filename = self.path / name
+            if content is None:
+                filename.unlink()
+            else:
+                filename.parent.mkdir(parents=True, exist_ok=True)
+                filename.write_text(content)
+        self.num_commits += 1
+        self.git("add", "-A")
+        self.git("commit", "-q", "--allow-empty", "-m", message or f"commit #{self.num_commits}")
+        return self.git("rev-parse", "HEAD").strip()
+
+    def merge(self, branch: str, message: str) -> str:
+        self.num_commits += 1
+        self.git("merge", "-q", "--no-ff", branch, "-m", message)
+        return self.git("rev-parse", "HEAD").strip()
+
+
+def commit_dicts(git: Giterator, *filenames: str, **kwargs) -> List[dict]:
+    dicts = []
+    for commit in git.iter_commits(*filenames, **kwargs):
+        commit = commit.to_dict()
+        # not cached
+        commit.pop("ref_names")
+        dicts.append(commit)
+    return dicts
+
+
+class TestGiterator(unittest.TestCase):
+
+    def test_iter_commits_consecutive(self):
+        for seed in range(10):
+            commits = create_history(seed, 500)
+            git = FakeGiterator(commits)
+            for branch_length, branch_age in ((100, 100), (5, 100), (100, 5), (3, 3), (0, 10), (10, 0)):
+                expected = [
+                    c.hash
+                    for c in iter_commits_consecutive_quadratic(commits, branch_length, branch_age)
+                ]
+                result = [
+                    c.hash
+                    for c in git.iter_commits_consecutive(branch_length=branch_length, branch_age=branch_age)
+                ]
+                self.assertEqual(expected, result, f"seed={seed} length={branch_length} age={branch_age}")
+                self.assertEqual(len(commits), len(set(result)))
+
+    def test_iter_commits_consecutive_offset_count(self):
+        commits = create_history(23, 300)
+        git = FakeGiterator(commits)
+        self.assertEqual(
+            [c.hash for c in iter_commits_consecutive_quadratic(commits[50:150], 10, 10)],
+            [c.hash for c in git.iter_commits_consecutive(offset=50, count=100, branch_length=10, branch_age=10)],
+        )
+
+
+class TestBlobCache(unittest.TestCase):
+
+    def test_lru(self):
+        cache = BlobCache(10)
+        cache.put("a", "blob", b"1234")
+        cache.put("b", "blob", b"1234")
+        self.assertEqual(("blob", b"1234"), cache.get("a"))
+        cache.put("c", "blob", b"1234")
+        # "b" was the least recently used
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+        self.assertEqual(8, cache.num_bytes)
+        self.assertEqual((3, 1, 1), (cache.hits, cache.misses, cache.evictions))
+
+        cache.put("d", "blob", b"12345678901")
+        self.assertIsNone(cache.get("d"))
+
+    def test_spill(self):
+        with tempfile.TemporaryDirectory() as path:
+            cache = BlobCache(4, spill_path=path)
+            cache.put("a", "blob", b"1234")
+            cache.put("b", "tree", b"5678")
+            self.assertEqual(("blob", b"1234"), cache.get("a"))
+            self.assertEqual(1, cache.spill_hits)
+            self.assertEqual(("tree", b"5678"), cache.get("b"))
+            self.assertEqual(2, cache.spill_hits)
+
+    def test_immutable(self):
+        self.assertTrue(BlobCache.is_immutable("0123456789abcdef0123456789abcdef01234567"))
+        self.assertTrue(BlobCache.is_immutable("0123456789abcdef0123456789abcdef01234567:docs/a.ndjson"))
+        self.assertFalse(BlobCache.is_immutable("HEAD:docs/a.ndjson"))
+        self.assertFalse(BlobCache.is_immutable("0123456789abcdef:docs/a.ndjson"))
+
+
+class TestCommitCache(unittest.TestCase):
+
+    def _assert_cached(self, repo: TempRepo, git_args: Optional[List[str]] = None):
+        # a new instance to read the cache from disk
+        cached = Giterator(repo.path, cache=True, git_args=git_args)
+        uncached = Giterator(repo.path, git_args=git_args)
+        for filenames in ((), ("dir",), ("dir/b1.txt",)):
+            for kwargs in ({}, {"raw": True}, {"reverse": True, "offset": 1, "count": 2}):
+                self.assertEqual(
+                    commit_dicts(uncached, *filenames, **kwargs),
+                    commit_dicts(cached, *filenames, **kwargs),
+                    f"filenames={filenames} kwargs={kwargs}",
+                )
+            self.assertEqual(uncached.num_commits(*filenames), cached.num_commits(*filenames))
+
+    def test_cache(self):
+        repo = TempRepo()
+        try:
+            for i in range(5):
+                repo.commit({"a.txt": f"a{i}", f"dir/b{i % 2}.txt": f"b{i}"})
+
+            self._assert_cached(repo)
+            self.assertTrue((repo.path / ".git" / "giterator-cache").is_dir())
+            # read from the cache
+            self._assert_cached(repo)
+
+            repo.commit({"dir/b1.txt": "new"})
+            repo.commit({"a.txt": None})
+            self._assert_cached(repo)
+
+            repo.git("reset", "-q", "--hard", "HEAD~3")
+            repo.commit({"dir/c.txt": "rewritten"})
+            self._assert_cached(repo)
+
+            counts = Giterator(repo.path, cache=True)._get_cache()._read_json(
+                repo.path / ".git" / "giterator-cache" / "counts.json"
+            )
+            # one entry per path filter
+            self.assertEqual(3, len(counts))
+        finally:
+            repo.close()
+
+    def test_merge(self):
+        repo = TempRepo()
+        try:
+            repo.commit({"a.txt": "a", "dir/b1.txt": "b"})
+            repo.git("checkout", "-q", "-b", "side")
+            # older than the following commits on main
+            repo.commit({"dir/b1.txt": "side 1"})
+            repo.commit({"dir/b2.txt": "side 2"})
+            repo.git("checkout", "-q", "main")
+            repo.commit({"a.txt": "main 1"})
+            repo.commit({"dir/b3.txt": "main 2"})
+            for git_args in (None, ["--all"]):
+                self._assert_cached(repo, git_args)
+
+            repo.merge("side", "merge side")
+            repo.commit({"a.txt": "after the merge"})
+            for git_args in (None, ["--all"]):
+                self._assert_cached(repo, git_args)
+
+            # only another branch moves
+            repo.git("checkout", "-q", "side")
+            repo.commit({"dir/b2.txt": "side 3"})
+            repo.git("checkout", "-q", "main")
+            for git_args in (None, ["--all"]):
+                self._assert_cached(repo, git_args)
+
+            # new and cached commits have no ref_names
+            repo.commit({"a.txt": "new"})
+            commits = list(Giterator(repo.path, cache=True).iter_commits())
+            self.assertEqual(8, len(commits))
+            self.assertEqual([[]] * 8, [c.ref_names for c in commits])
+        finally:
+            repo.close()
+
+    def test_worktree(self):
+        repo = TempRepo()
+        try:
+            repo.commit({"a.txt": "a"})
+            worktree = repo.path / "worktree"
+            repo.git("worktree", "add", "-q", str(worktree))
+            git = Giterator(worktree, cache=True)
+            self.assertEqual(1, git.num_commits())
+            self.assertEqual((repo.path / ".git" / "giterator-cache").resolve(), git._get_cache().path)
+        finally:
+            repo.close()
+
+    def test_no_repository(self):
+        with tempfile.TemporaryDirectory() as path:
+            git = Giterator(path, cache=True)
+            self.assertIsNone(git._get_cache())
+
+
+class TestAsyncGiterator(unittest.TestCase):
+
+    def test_cancelled_read(self):
+        repo = TempRepo()
+        try:
+            repo.commit({"big.txt": "x" * 20_000_000, "small.txt": "small"})
+
+            async def _read():
+                async with AsyncGiterator(repo.path, max_concurrent_reads=1) as git:
+                    task = asyncio.ensure_future(git.read_blob("HEAD", "big.txt"))
+                    # let it start reading
+                    for i in range(10):
+                        await asyncio.sleep(0)
+                    task.cancel()
+                    with self.assertRaises(asyncio.CancelledError):
+                        await task
+
+                    return await git.read_blob("HEAD", "small.txt")
+
+            self.assertEqual(b"small", asyncio.run(_read()))
+        finally:
+            repo.close()
+
+
+class TestObjectStore(unittest.TestCase):
+
+    def _create_history(self, repo: TempRepo):
+        rnd = random.Random(23)
+        lines = [f"line {i}\n" for i in range(200)]
+        for i in range(30):
+            lines[rnd.randrange(len(lines))] = f"changed {i}\n"
+            repo.commit({
+                "docs/file.txt": "".join(lines),
+                f"docs/other{i % 3}.txt": f"version {i}\n" * 50,
+            })
+        repo.git("tag", "-a", "-m", "tag", "v1")
+
+    def _assert_objects(self, repo: TempRepo):
+        objects = [
+            line.split()
+            for line in repo.git("cat-file", "--batch-all-objects", "--batch-check").splitlines()
+        ]
+        # commits, trees, blobs and the tag
+        self.assertGreater(len(objects), 100)
+        with ObjectStore(str(repo.path)) as store:
+            for hash, type, size in objects:
+                expected = subprocess.check_output(["git", "cat-file", type, hash], cwd=repo.path)
+                self.assertEqual((type, expected), store.read_hash(hash), f"{type} {hash}")
+
+            self.assertIsNone(store.read_hash("0" * 40))
+            self.assertIsNone(store.read("HEAD:docs/missing.txt"))
+            self.assertEqual(
+                subprocess.check_output(["git", "show", "HEAD~3:docs/file.txt"], cwd=repo.path),
+                store.read(f"{repo.git('rev-parse', 'HEAD~3').strip()}:docs/file.txt")[1],
+            )
+
+    def test_packed(self):
+        repo = TempRepo()
+        try:
+            self._create_history(repo)
+            # long OFS_DELTA chains
+            repo.git("repack", "-adfq", "--depth=250")
+            self.assertEqual([], list((repo.path / ".git" / "objects").glob("??/*")))
+            # and some loose objects
+            repo.commit({"docs/file.txt": "loose\n"})
+            self._assert_objects(repo)
+        finally:
+            repo.close()
+
+    def test_ref_delta(self):
+        repo = TempRepo()
+        try:
+            self._create_history(repo)
+            repo.git("-c", "repack.useDeltaBaseOffset=false", "repack", "-adfq", "--depth=250")
+            self._assert_objects(repo)
+        finally:
+            repo.close()
+
+    def test_refs(self):
+        repo = TempRepo()
+        try:
+            repo.commit({"a.txt": "hello\n"})
+            repo.git("tag", "same")
+            repo.git("checkout", "-q", "-b", "same")
+            repo.commit({"a.txt": "branch\n"})
+            repo.git("checkout", "-q", "main")
+            repo.git("branch", "wt")
+            worktree = repo.path / "worktree"
+            repo.git("worktree", "add", "-q", str(worktree), "wt")
+            repo.git("-C", str(worktree), "commit", "-q", "-am", "worktree", "--allow-empty")
+            (worktree / "a.txt").write_text("worktree\n")
+            repo.git("-C", str(worktree), "commit", "-q", "-am", "worktree")
+            repo.git("pack-refs", "--all")
+
+            for path in (repo.path, worktree):
+                store = ObjectStore(str(path))
+                git = Giterator(path, object_store=True)
+                git_catfile = Giterator(path)
+                try:
+                    for revision in ("HEAD", "main", "same", "wt", "refs/heads/same", "tags/same", "HEAD~1"):
+                        self.assertEqual(
+                            git_catfile.read_blob(revision, "a.txt"),
+                            git.read_blob(revision, "a.txt"),
+                            f"{path.name}: {revision}",
+                        )
+                    # only git understands these
+                    for revision in ("HEAD~1", "missing", "MERGE_HEAD"):
+                        with self.assertRaises(ValueError, msg=f"{path.name}: {revision}"):
+                            store.resolve(revision)
+                    self.assertIsNone(git.read_blob("missing", "a.txt"))
+                finally:
+                    store.close()
+                    git.close()
+                    git_catfile.close()
+
+            self.assertEqual(b"worktree\n", Giterator(worktree, object_store=True).read_blob("HEAD", "a.txt"))
+            self.assertEqual(b"hello\n", Giterator(repo.path, object_store=True).read_blob("same", "a.txt"))
+        finally:
+            repo.close()
+
+
+class TestCommits(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.repo = repo = TempRepo()
+        repo.commit({"a.txt": "a\n" * 20, "b.txt": "b\n"})
+        repo.git("checkout", "-q", "-b", "side")
+        repo.commit({"b.txt": "side\n"}, "side\n\nwith a body\n")
+        repo.git("checkout", "-q", "main")
+        cls.rename_hash = repo.commit({"a.txt": None, "c.txt": "a\n" * 20}, "rename")
+        cls.merge_hash = repo.merge("side", "merge side")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.repo.close()
+
+    def test_raw(self):
+        commits = {c.hash: c for c in Giterator(self.repo.path).iter_commits(raw=True)}
+        self.assertEqual(4, len(commits))
+
+        for hash, commit in commits.items():
+            # git log prints no diff for merge commits
+            if hash == self.merge_hash:
+                self.assertEqual([], commit.changes)
+                continue
+
+            expected = {}
+            for line in self.repo.git(
+                    "diff-tree", "-r", "-M", "--root", "--raw", "--no-abbrev", "--no-commit-id", hash,
+            ).splitlines():
+                info, *names = line[1:].split("\t")
+                old_blob, new_blob = info.split()[2:4]
+                expected[names[-1]] = (
+                    names[0] if len(names) > 1 else None,
+                    None if old_blob == "0" * 40 else old_blob,
+                    None if new_blob == "0" * 40 else new_blob,
+                )
+
+            self.assertEqual(
+                expected,
+                {
+                    ch["name"]: (ch.get("old_name"), ch["old_blob"], ch["new_blob"])
+                    for ch in commit.changes
+                },
+                hash,
+            )
+
+        rename = commits[self.rename_hash].changes
+        self.assertEqual(1, len(rename))
+        self.assertEqual(("rename", "a.txt", "c.txt"), (rename[0]["type"], rename[0]["old_name"], rename[0]["name"]))
+        self.assertEqual(self.repo.git("rev-parse", f"{self.rename_hash}:c.txt").strip(), rename[0]["new_blob"])
+
+    def test_blob_history(self):
+        repo = TempRepo()
+        try:
+            repo.commit({"docs/a.txt": "a", "docs/b.txt": "b", "other.txt": "o"})
+            repo.commit({"docs/a.txt": "a2"})
+            repo.commit({"other.txt": "o2"})
+            repo.commit({"docs/b.txt": None, "docs/c d.txt": "c"})
+            repo.commit({"docs/a.txt": "a3", "docs/e.txt": "a2"})
+            repo.commit({"docs/a.txt": "a", "docs/c d.txt": None})
+
+            git = Giterator(repo.path)
+            for paths in ((), ("docs",)):
+                expected = []
+                for commit in git.iter_commits(*paths, raw=True, parse_changes=False):
+                    blobs = sorted(
+                        (change["name"], git.read_blob(change["new_blob"]))
+                        for change in commit.changes
+                        if change["new_blob"]
+                    )
+                    if blobs:
+                        expected.append((commit.hash, blobs))
+
+                history = []
+                for hash, filename, data in git.iter_blob_history(*paths):
+                    if not history or history[-1][0] != hash:
+                        history.append((hash, []))
+                    history[-1][1].append((filename, data))
+                history = [(hash, sorted(blobs)) for hash, blobs in history]
+
+                self.assertEqual(expected, history, f"paths={paths}")
+        finally:
+            repo.close()
+
+    def test_lazy_fields(self):
+        git = Giterator(self.repo.path)
+        fields = ["message", "author_date", "committer_date", "parent_hash", "author", "tree_hash", "changes"]
+        eager = {c.hash: c.to_dict() for c in git.iter_commits()}
+
+        for hash, commit in eager.items():
+            message, author_date, parents, tree_hash = self.repo.git(
+                "log", "-1", "--format=%B%x00%aI%x00%P%x00%T", hash,
+            ).split("\x00")
+            self.assertEqual(message.strip(), commit["message"].strip())
+            self.assertEqual(datetime.datetime.fromisoformat(author_date), commit["author_date"])
+            self.assertEqual(parents.split(), commit["parent_hash"])
+            self.assertEqual(tree_hash.strip(), commit["tree_hash"])
+
+        # each field decoded on its own equals the fully decoded commit
+        for field in fields:
+            for commit in git.iter_commits():
+                self.assertEqual(eager[commit.hash][field], getattr(commit, field), field)
@@ -0,0 +1,163 @@
+import json
+import datetime
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+from src.iterator import SnapshotRepository, TeletextIterator, _timestamp_str
+from src.tests.test_giterator import TempRepo
+
+
+def snapshot(channel: str, timestamp: str, pages: Dict[int, str]) -> str:
+    lines = [json.dumps({"scraper": channel, "timestamp": timestamp})]
+    for page, text in pages.items():
+        lines.append(json.dumps({"page": page, "sub_page": 1, "timestamp": timestamp}))
+        lines.append(json.dumps([["wb", text]]))
+    return "\n".join(lines) + "\n"
+
+
+def batch_contents(batches) -> List[tuple]:
+    return [
+        (timestamp, sorted(
+            (tt.commit_hash, tt.timestamp, [(index, page.digest) for index, page in sorted(tt.pages.items())])
+            for tt in teletexts
+        ))
+        for timestamp, teletexts in batches
+    ]
+
+
+class TestSnapshotRepository(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.repo = TempRepo()
+        repo = cls.repo
+        path = "docs/snapshots"
+        repo.commit({
+            f"{path}/zdf.ndjson": snapshot("zdf", "2023-01-01T00:00:01", {100: "a", 101: "b"}),
+            f"{path}/ard.ndjson": snapshot("ard", "2023-01-01T00:00:01", {100: "c"}),
+        })
+        repo.commit({f"{path}/zdf.ndjson": snapshot("zdf", "2023-01-01T00:00:02", {100: "a", 101: "b2"})})
+        repo.git("checkout", "-q", "-b", "side")
+        repo.commit({f"{path}/ard.ndjson": snapshot("ard", "2023-01-01T00:00:03", {100: "c2"})})
+        repo.commit({f"{path}/ard.ndjson": snapshot("ard", "2023-01-01T00:00:04", {100: "c3", 200: "d"})})
+        repo.git("checkout", "-q", "main")
+        repo.commit({f"{path}/zdf.ndjson": snapshot("zdf", "2023-01-01T00:00:05", {100: "a3", 101: "b2"})})
+        cls.merge_hash = repo.merge("side", "merge side")
+        repo.commit({"README.md": "no snapshot changes"})
+        repo.commit({f"{path}/_timestamps.ndjson": ""})
+        # files in sub-directories are not snapshots
+        repo.commit({f"{path}/old/zdf.ndjson": snapshot("zdf", "2023-01-01T00:00:07", {100: "old"})})
+        repo.commit({
+            f"{path}/old/ard.ndjson": snapshot("ard", "2023-01-01T00:00:07", {100: "old"}),
+            f"{path}/zdf.ndjson": snapshot("zdf", "2023-01-01T00:00:08", {100: "a4"}),
+        })
+        repo.commit({
+            f"{path}/zdf.ndjson": snapshot("zdf", "2023-01-01T00:00:09", {100: "a5"}),
+            f"{path}/ard.ndjson": None,
+        })
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.repo.close()
+
+    def test_sharded(self):
+        snapshots = SnapshotRepository(self.repo.path, "docs/snapshots")
+        with ProcessPoolExecutor(2) as executor:
+            for changed_only in (False, True):
+                serial = batch_contents(snapshots.iter_commit_teletexts(
+                    [], changed_only=changed_only,
+                ))
+                for shard_size in (1, 2, 3):
+                    sharded = batch_contents(snapshots.iter_commit_teletexts(
+                        [], changed_only=changed_only,
+                        executor=executor, shard_size=shard_size, max_pending=2,
+                    ))
+                    self.assertEqual(serial, sharded, f"changed_only={changed_only}, shard_size={shard_size}")
+
+                self.assertNotIn(
+                    "2023-01-01T00:00:07",
+                    [tt[1] for _, teletexts in serial for tt in teletexts],
+                )
+                if changed_only:
+                    # the merge yields the snapshot that changed against the first parent
+                    merge = [teletexts for _, teletexts in serial if teletexts and teletexts[0][0] == self.merge_hash]
+                    self.assertEqual(1, len(merge))
+                    self.assertEqual(["2023-01-01T00:00:04"], [tt[1] for tt in merge[0]])
+                    self.assertEqual(7, len(serial))
+                else:
+                    self.assertEqual(10, len(serial))
+
+    def test_commit_timestamps(self):
+        tt_iterator = TeletextIterator(roots=[self.repo.path], verbose=False)
+        self.assertEqual(
+            ["2023-01-01T00:00:01", "2023-01-01T00:00:02", "2023-01-01T00:00:05",
+             "2023-01-01T00:00:08", "2023-01-01T00:00:09"],
+            sorted(timestamp for timestamp, _ in tt_iterator.iter_commit_timestamps()),
+        )
+
+    def test_prefetch(self):
+        snapshots = SnapshotRepository(self.repo.path, "docs/snapshots")
+
+        for prefetch, prefetch_bytes, max_ahead in (
+                (3, 10 ** 9, 3),
+                (5, 450, 1),
+                (5, 150, 1),
+        ):
+            started = []
+
+            def _read(index: int, name: str) -> bytes:
+                started.append(index)
+                return f"{index} {name}".encode().ljust(100)
+
+            def _not_read() -> bytes:
+                raise AssertionError("only snapshot files are read")
+
+            commit_files = [
+                (f"commit{i}", [
+                    ("_timestamps.ndjson", _not_read),
+                    ("zdf.ndjson", lambda i=i: _read(i, "zdf")),
+                    ("ard.ndjson", lambda i=i: _read(i, "ard")),
+                ])
+                for i in range(10)
+            ]
+            yielded = []
+            for commit_hash, files in snapshots._prefetch_snapshot_files(
+                    commit_files, [], prefetch, prefetch_bytes,
+            ):
+                index = len(yielded)
+                self.assertLessEqual(max(started), index + max_ahead, f"prefetch={prefetch}/{prefetch_bytes}")
+                yielded.append((commit_hash, [(name, data()) for name, data in files]))
+
+            self.assertEqual(
+                [
+                    (f"commit{i}", [("zdf.ndjson", _read(i, "zdf")), ("ard.ndjson", _read(i, "ard"))])
+                    for i in range(10)
+                ],
+                yielded,
+            )
+
+            # stopping early does not read the remaining commits
+            started.clear()
+            stream = snapshots._prefetch_snapshot_files(commit_files, [], prefetch, prefetch_bytes)
+            next(stream)
+            stream.close()
+            self.assertLessEqual(max(started), max_ahead)
+
+
+class TestTimestamps(unittest.TestCase):
+
+    def test_timestamp_str(self):
+        self.assertEqual("2023-01-01T12:00:00", _timestamp_str("2023-01-01T12:00:00"))
+        self.assertEqual("2023-01-01T12:00:00", _timestamp_str("2023-01-01 12:00"))
+        self.assertEqual("2023-01-01T00:00:00", _timestamp_str("2023-01-01"))
+        self.assertEqual("2023-01-01T10:00:00", _timestamp_str("2023-01-01T12:00:00+02:00"))
+        self.assertEqual("2023-01-01T12:00:00", _timestamp_str(datetime.datetime(2023, 1, 1, 12, 0, 0, 500)))
+        self.assertEqual(
+            "2023-01-01T10:00:00",
+            _timestamp_str(datetime.datetime(2023, 1, 1, 12, tzinfo=datetime.timezone(datetime.timedelta(hours=2)))),
+        )
+        self.assertEqual(
+            "2023-01-01T12:00:00",
+            _timestamp_str(datetime.datetime(2023, 1, 1, 12, tzinfo=datetime.timezone.utc)),
+        )
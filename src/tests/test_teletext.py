@@ -1,10 +1,28 @@
+import io
+import json
 import unittest
 
-from src.teletext import Teletext, TeletextPage
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+from src.teletext import Teletext, TeletextPage, LineInternTable, codec
 
 
 class TestTeletex(unittest.TestCase):
 
+    NDJSON = "\n".join([
+        '{"scraper":"zdf","timestamp":"2023-01-01T00:00:00"}',
+        '{"page":101,"sub_page":1,"timestamp":"2023-01-01T00:00:01"}',
+        '[["wb","first"]]',
+        '[["rb","second"],["gb",[102,1],"102"]]',
+        '{"page":100,"sub_page":1,"timestamp":"2023-01-01T00:00:02"}',
+        '{"page":102,"sub_page":1,"timestamp":"2023-01-01T00:00:03","error":"timeout"}',
+        '{"page":100,"sub_page":2,"timestamp":"2023-01-01T00:00:04"}',
+        '[["wb","last"]]',
+    ]).encode()
+
     def test_comparison(self):
         page1 = TeletextPage()
         page1.new_line()
@@ -21,9 +39,170 @@ class TestTeletex(unittest.TestCase):
         self.assertEqual(page1, page2)
         self.assertNotEqual(page1, page3)
 
+    def test_digest(self):
+        tt = Teletext.from_ndjson(self.NDJSON)
+        page = tt.get_page(101)
+        other = Teletext.from_ndjson(self.NDJSON).get_page(101)
+        self.assertEqual(page.digest, other.digest)
+        self.assertEqual(page.line_hashes, other.line_hashes)
+        self.assertNotEqual(page.digest, tt.get_page(100, 2).digest)
+
+        other.lines[1][0].text = "changed"
+        other.invalidate_digest()
+        self.assertNotEqual(page, other)
+        self.assertEqual([1], page.changed_lines(other))
+
+        other.new_line()
+        self.assertEqual([1, 2], page.changed_lines(other))
+
     def test_json(self):
         block = TeletextPage.Block("text", "r", "g", 1, [1, 23])
         self.assertEqual(
             block,
             TeletextPage.Block.from_json(block.to_json())
-        )
\ No newline at end of file
+        )
+
+    def test_page_index(self):
+        tt = Teletext.from_ndjson(self.NDJSON)
+        self.assertEqual([(100, 1), (100, 2), (101, 1), (102, 1)], tt.page_index)
+
+        page = TeletextPage()
+        page.index, page.sub_index = 101, 3
+        tt.add_page(page)
+        tt.add_page(page)
+        self.assertEqual([(100, 1), (100, 2), (101, 1), (101, 3), (102, 1)], tt.page_index)
+        self.assertEqual([1, 3], tt.get_sub_pages(101))
+        self.assertIs(tt.pages[(100, 1)], tt.get_page(100))
+        self.assertIsNone(tt.get_page(103))
+
+        self.assertEqual((101, 3), tt.get_next_page(101, 2, 0))
+        self.assertEqual((101, 3), tt.get_next_page(101, 1, 1))
+        self.assertEqual((100, 1), tt.get_next_page(102, 1, 1))
+        self.assertEqual((100, 2), tt.get_next_page(101, 0, -1))
+        self.assertEqual((102, 1), tt.get_next_page(100, 1, -1))
+
+    def test_lazy_ndjson(self):
+        data = self.NDJSON
+
+        tt = Teletext.from_ndjson(data)
+        lazy_tt = Teletext.from_ndjson(data, lazy=True)
+
+        self.assertEqual(tt.page_index, lazy_tt.page_index)
+        self.assertEqual(4, lazy_tt.pages.num_unparsed)
+        self.assertEqual(tt.get_page(101), lazy_tt.get_page(101))
+        self.assertEqual(3, lazy_tt.pages.num_unparsed)
+
+        for index, page in tt.pages.items():
+            self.assertEqual(page.to_ndjson(), lazy_tt.pages[index].to_ndjson())
+        self.assertEqual(0, lazy_tt.pages.num_unparsed)
+
+    def test_intern_table(self):
+        table = LineInternTable()
+        tt = Teletext.from_ndjson(self.NDJSON)
+        tt1 = Teletext.from_ndjson(self.NDJSON, intern_table=table)
+        tt2 = Teletext.from_ndjson(self.NDJSON, lazy=True, intern_table=table)
+
+        for index, page in tt.pages.items():
+            self.assertEqual(page.to_ndjson(), tt1.pages[index].to_ndjson())
+            self.assertEqual(page.to_ndjson(), tt2.pages[index].to_ndjson())
+            for line1, line2 in zip(tt1.pages[index].lines, tt2.pages[index].lines):
+                self.assertIs(line1, line2)
+        self.assertEqual((3, 3), (table.hits, table.misses))
+
+        table = LineInternTable(max_lines=2)
+        tt1 = Teletext.from_ndjson(self.NDJSON, intern_table=table)
+        tt2 = Teletext.from_ndjson(self.NDJSON, intern_table=table)
+        self.assertEqual(2, len(table))
+        # the first line was pushed out of the table by the following two
+        self.assertIsNot(tt1.get_page(101).lines[0], tt2.get_page(101).lines[0])
+
+    def test_previous_ndjson(self):
+        tt = Teletext.from_ndjson(self.NDJSON)
+        tt1 = Teletext.from_ndjson(self.NDJSON, previous=Teletext())
+        data = self.NDJSON.replace(b'"last"', b'"changed"')
+        tt2 = Teletext.from_ndjson(data, previous=tt1)
+
+        self.assertEqual(tt.page_index, tt1.page_index)
+        for index, page in tt.pages.items():
+            self.assertEqual(page.to_ndjson(), tt1.pages[index].to_ndjson())
+
+        for index in tt1.page_index:
+            if index == (100, 2):
+                self.assertIsNot(tt1.pages[index], tt2.pages[index])
+                self.assertEqual('[["wb","changed"]]\n', tt2.pages[index].to_ndjson().splitlines(True)[1])
+            else:
+                self.assertIs(tt1.pages[index], tt2.pages[index])
+
+        # repeated page index, the last one is kept
+        header = '{"page":521,"sub_page":1,"timestamp":"2023-01-01T00:00:01"}'
+        page_a = f'{header}\n[["wb","A"]]'.encode()
+        page_b = f'{header}\n[["wb","B"]]'.encode()
+        file_header = self.NDJSON.split(b"\n")[0]
+        tt1 = Teletext.from_ndjson(b"\n".join([file_header, page_a, page_b]), previous=Teletext())
+        self.assertEqual("B", tt1.get_page(521).lines[0][0].text)
+        tt2 = Teletext.from_ndjson(b"\n".join([file_header, page_a]), previous=tt1)
+        self.assertEqual("A", tt2.get_page(521).lines[0][0].text)
+
+    def test_scan_headers(self):
+        header, pages = Teletext.scan_headers(self.NDJSON)
+        self.assertEqual({"scraper": "zdf", "timestamp": "2023-01-01T00:00:00"}, header)
+        self.assertEqual(
+            [
+                (101, 1, "2023-01-01T00:00:01", None),
+                (100, 1, "2023-01-01T00:00:02", None),
+                (102, 1, "2023-01-01T00:00:03", "timeout"),
+                (100, 2, "2023-01-01T00:00:04", None),
+            ],
+            pages,
+        )
+        self.assertEqual((header, []), Teletext.scan_headers(self.NDJSON, pages=False))
+
+    def test_iter_pages_ndjson(self):
+        tt = Teletext.from_ndjson(self.NDJSON)
+        header = {}
+        pages = list(Teletext.iter_pages_ndjson(io.BytesIO(self.NDJSON), header=header))
+
+        self.assertEqual({"scraper": "zdf", "timestamp": "2023-01-01T00:00:00"}, header)
+        self.assertEqual(
+            [tt.pages[index].to_ndjson() for index in tt.pages],
+            [page.to_ndjson() for page in pages],
+        )
+
+    def test_codec(self):
+        for obj in (
+                {"page": 100, "sub_page": 1, "timestamp": "2023-01-01T00:00:01", "error": None},
+                [["wb", "äöü \u2028 \x00\x1b\x7f \"\\ 🬀"], ["rb", [101, 2], "101"]],
+                ["\ud800"],
+        ):
+            expected = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+            self.assertEqual(expected, codec.dumps(obj))
+            self.assertEqual(obj, codec.loads(expected))
+
+        with self.assertRaises(ValueError):
+            codec.loads("[1,")
+
+    @unittest.skipIf(numpy is None, "numpy not installed")
+    def test_grid(self):
+        tt = Teletext.from_ndjson(self.NDJSON)
+        page = tt.get_page(101)
+        page.lines[0].append(TeletextPage.Block("", "r"))
+        page.lines[1].append(TeletextPage.Block("🬀🬁", "y", "l", 1))
+
+        grid = page.to_grid()
+        self.assertEqual((25, 40), grid.shape)
+        self.assertEqual(
+            [[b.to_json() for b in line] for line in page.lines],
+            [[b.to_json() for b in line] for line in grid.to_lines()],
+        )
+        self.assertEqual(grid, page.to_grid())
+
+        other_page = grid.to_page()
+        other_page.lines[1][0].text = "SECOND"
+        other = other_page.to_grid()
+        self.assertNotEqual(grid, other)
+        self.assertEqual([False, True] + [False] * 23, grid.changed_lines(other).tolist())
+        self.assertTrue(grid.equals(other, mask=grid.region_mask(rows=[0])))
+
+        stacked = grid.stack([grid, other, tt.get_page(100, 2).to_grid()])
+        self.assertEqual((3, 25, 40), stacked.shape)
+        self.assertEqual([0, 6, 16], stacked.changed_mask(grid).sum(axis=(1, 2)).tolist())